@@ -0,0 +1,94 @@
+# Query Plans Of The Insights Queries Without And With The Insightly Covering Indexes
+#
+#   bench --site your-site-name execute insightly.benchmarks.index_plans.run
+#   bench --site your-site-name execute insightly.benchmarks.index_plans.run --kwargs "{'days': 90, 'repeat': 10}"
+#
+# "before" forces the optimizer to ignore the Insightly index (IGNORE INDEX), "after" lets it use it,
+# so the comparison is safe to run on a live site.
+
+import json
+import time
+
+import frappe
+from frappe.utils import add_days, nowdate
+
+from insightly.insights.cycles import CYCLES
+from insightly.insights.dates import get_window_conditions, get_window_values
+from insightly.insights.indexes import INDEX_NAME, get_index_columns
+from insightly.insights.rollup import ROLLUP_DOCTYPE, get_column_expressions, get_source_conditions
+
+
+def run(days=365, repeat=5):
+    start_date, end_date = add_days(nowdate(), -days), nowdate()
+    results = []
+
+    for party_type, cycle in CYCLES.items():
+        for source in cycle.sources:
+            party = get_busiest_party(party_type, source)
+            if not party:
+                continue
+
+            query = f"""
+                SELECT {get_column_expressions(source)}
+                FROM `tab{source.doctype}` {{hint}}
+                WHERE {get_source_conditions(source)}
+                    AND {source.party_field} = %(party)s
+                    AND {get_window_conditions(source.date_field)}
+            """
+            values = {"party_type": party_type, "party": party, **get_window_values(start_date, end_date)}
+            results.append(compare_plans(f"{party_type} / {source.doctype}", source.doctype, query, values, repeat))
+
+        rollup_query = f"""
+            SELECT party, reference_doctype, SUM(record_count), SUM(grand_total), SUM(outstanding)
+            FROM `tab{ROLLUP_DOCTYPE}` {{hint}}
+            WHERE party_type = %(party_type)s
+                AND reference_doctype IN %(doctypes)s
+                AND {get_window_conditions("posting_date")}
+            GROUP BY party, reference_doctype
+        """
+        values = {
+            "party_type": party_type,
+            "doctypes": tuple(source.doctype for source in cycle.sources),
+            **get_window_values(start_date, end_date),
+        }
+        results.append(compare_plans(f"{party_type} / {ROLLUP_DOCTYPE}", ROLLUP_DOCTYPE, rollup_query, values, repeat))
+
+    print(json.dumps(results, indent=2, default=str))
+    return results
+
+
+def compare_plans(label, doctype, query, values, repeat):
+    result = {"query": label, "index": get_index_columns(doctype)}
+
+    hints = {"before": f"IGNORE INDEX (`{INDEX_NAME}`)" if result["index"] else "", "after": ""}
+    for stage, hint in hints.items():
+        sql = query.format(hint=hint)
+        plan = frappe.db.sql(f"EXPLAIN {sql}", values, as_dict=True)
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            frappe.db.sql(sql, values)
+
+        result[stage] = {
+            "plan": [
+                {key: row.get(key) for key in ("type", "possible_keys", "key", "rows", "Extra")}
+                for row in plan
+            ],
+            "avg_ms": round((time.perf_counter() - started) * 1000 / repeat, 3),
+        }
+
+    return result
+
+
+def get_busiest_party(party_type, source):
+    # The party with the most documents gives the most representative range scan
+    party = frappe.db.sql(f"""
+        SELECT {source.party_field}
+        FROM `tab{source.doctype}`
+        WHERE {get_source_conditions(source)}
+        GROUP BY {source.party_field}
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """, {"party_type": party_type})
+
+    return party[0][0] if party else None
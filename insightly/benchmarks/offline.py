@@ -0,0 +1,176 @@
+# Offline SQLite Stand-In Of frappe.db For The Benchmark Suite
+#
+# Lets insightly.benchmarks.suite run without a site or MariaDB server: offline_site() points frappe.local at
+# an OfflineDatabase holding only the tables and columns Insightly reads. Queries are written for MariaDB, so
+# parameters are translated (%(name)s, %s and tuple IN lists) and the MariaDB functions Insightly uses (MD5,
+# CONCAT_WS and the date functions of the trend buckets) are provided as SQLite functions.
+# Timings are only comparable with other offline runs.
+
+import datetime
+import hashlib
+import re
+import sqlite3
+from contextlib import contextmanager
+
+import frappe
+
+from insightly.insights.cycles import CYCLES
+from insightly.insights.rollup import ROLLUP_COLUMNS, ROLLUP_DOCTYPE
+
+STANDARD_COLUMNS = ["name TEXT PRIMARY KEY", "creation TEXT", "modified TEXT", "owner TEXT", "modified_by TEXT",
+    "docstatus INTEGER DEFAULT 0", "idx INTEGER DEFAULT 0"]
+CHILD_COLUMNS = ["parent TEXT", "parenttype TEXT", "parentfield TEXT"]
+
+PARTY_COLUMNS = ["default_currency TEXT", "mobile_no TEXT", "email_id TEXT"]
+DOCUMENT_COLUMNS = ["transaction_date TEXT", "posting_date TEXT", "due_date TEXT", "total REAL", "grand_total REAL", "total_qty REAL",
+    "outstanding_amount REAL", "is_return INTEGER DEFAULT 0", "return_against TEXT"]
+ITEM_COLUMNS = ["item_code TEXT", "item_name TEXT", "qty REAL", "rate REAL", "amount REAL", "delivered_qty REAL",
+    "received_qty REAL"]
+
+SCHEMA = {
+    "Customer": ["customer_name TEXT", "customer_group TEXT", *PARTY_COLUMNS],
+    "Supplier": ["supplier_name TEXT", "supplier_group TEXT", *PARTY_COLUMNS],
+    "Payment Request": ["party_type TEXT", "party TEXT", "transaction_date TEXT", "grand_total REAL",
+        "payment_request_type TEXT", "reference_doctype TEXT", "reference_name TEXT"],
+    "Payment Entry": ["party_type TEXT", "party TEXT", "posting_date TEXT", "paid_amount REAL", "payment_type TEXT",
+        "mode_of_payment TEXT", "unallocated_amount REAL", "reference_no TEXT"],
+    ROLLUP_DOCTYPE: ["party_type TEXT", "party TEXT", "reference_doctype TEXT", "posting_date TEXT",
+        *[f"{column} REAL" for column in ROLLUP_COLUMNS]],
+}
+
+INDEXES = {
+    ROLLUP_DOCTYPE: [["party_type", "reference_doctype", "posting_date", "party"], ["party_type", "modified"]],
+}
+
+DEFAULTS = {"currency": "USD"}
+
+
+def get_schema():
+    # Standard Columns Plus The Fields Insightly Reads For Every Party, Source And Item Table, With Their Indexes
+    schema = {doctype: list(columns) for doctype, columns in SCHEMA.items()}
+    indexes = {doctype: list(fields) for doctype, fields in INDEXES.items()}
+    for cycle in CYCLES.values():
+        for source in cycle.sources:
+            if source.doctype not in schema:
+                schema[source.doctype] = [f"{source.party_field} TEXT", *DOCUMENT_COLUMNS]
+                indexes[source.doctype] = [[source.party_field, "docstatus", source.date_field]]
+            if source.detail.get("child_doctype"):
+                schema[source.detail.child_doctype] = [*CHILD_COLUMNS, *ITEM_COLUMNS]
+                indexes[source.detail.child_doctype] = [["parent"]]
+
+    return schema, indexes
+
+
+class OfflineDatabase:
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.create_function("MD5", 1, lambda value: hashlib.md5(str(value).encode()).hexdigest())
+        self.conn.create_function("CONCAT_WS", -1, lambda separator, *values: separator.join(
+            str(value) for value in values if value is not None
+        ))
+        self.conn.create_function("DATEDIFF", 2, lambda first, second: (to_date(first) - to_date(second)).days)
+        self.conn.create_function("WEEKDAY", 1, lambda value: to_date(value).weekday())
+        self.conn.create_function("ADDDATE", 2, lambda value, days: (to_date(value) + datetime.timedelta(days=days)).isoformat())
+        self.conn.create_function("DATE_FORMAT", 2, lambda value, date_format: to_date(value).strftime(date_format))
+        self.create_tables()
+
+    def create_tables(self):
+        schema, indexes = get_schema()
+        for doctype, columns in schema.items():
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS `tab{doctype}` ({', '.join([*STANDARD_COLUMNS, *columns])})")
+            for idx, fields in enumerate(indexes.get(doctype, [])):
+                index_name = f"{frappe.scrub(doctype)}_{idx}"
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS `{index_name}` ON `tab{doctype}` ({', '.join(fields)})")
+
+    def sql(self, query, values=(), as_dict=False, as_list=False, as_iterator=False, **kwargs):
+        query, params = translate_query(query, values)
+        cursor = self.conn.execute(query, params)
+        if cursor.description is None:
+            return ()
+
+        rows = cursor.fetchall()
+        if as_dict:
+            names = [column[0] for column in cursor.description]
+            rows = [frappe._dict(zip(names, row)) for row in rows]
+        elif as_list:
+            rows = [list(row) for row in rows]
+
+        return iter(rows) if as_iterator else rows
+
+    def sql_list(self, query, values=()):
+        return [row[0] for row in self.sql(query, values)]
+
+    def sql_ddl(self, query, *args, **kwargs):
+        return self.sql(query)
+
+    def table_exists(self, doctype, cached=True):
+        return doctype in get_schema()[0]
+
+    def get_default(self, key, parent="__default"):
+        return DEFAULTS.get(key)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self, *args, **kwargs):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+def translate_query(query, values=()):
+    # MariaDB Style Parameters To SQLite: %(name)s -> :name, %s -> ?, tuple values expanded for IN lists
+    if isinstance(values, dict):
+        params = {}
+
+        def replace(match):
+            name = match.group(1)
+            value = values.get(name)
+            if isinstance(value, (list, tuple)):
+                keys = [f"{name}_{idx}" for idx in range(len(value))]
+                params.update({key: to_sqlite(item) for key, item in zip(keys, value)})
+                return f"({', '.join(f':{key}' for key in keys)})" if keys else "(NULL)"
+
+            params[name] = to_sqlite(value)
+            return f":{name}"
+
+        query = re.sub(r"%\((\w+)\)s", replace, query)
+    else:
+        if values is not None and not isinstance(values, (list, tuple)):
+            values = (values,)
+        params = [to_sqlite(value) for value in values or ()]
+        query = query.replace("%s", "?")
+
+    return query.replace("%%", "%"), params
+
+
+def to_sqlite(value):
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+
+    return value
+
+
+def to_date(value):
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+@contextmanager
+def offline_site(path=":memory:"):
+    # A Minimal frappe.local Around The SQLite Stand-In: no site, no Redis (the insights cache is disabled)
+    frappe.local.conf = frappe._dict(insightly_cache_ttl=0)
+    frappe.local.flags = frappe._dict()
+    frappe.local.session = frappe._dict(user="Administrator")
+    frappe.local.system_settings = frappe._dict(time_zone="UTC", currency=DEFAULTS["currency"])
+    frappe.local.lang = "en"
+    frappe.local.db = OfflineDatabase(path)
+
+    try:
+        yield frappe.local.db
+    finally:
+        frappe.local.db.close()
+        frappe.destroy()
@@ -0,0 +1,111 @@
+# Server CPU And Payload Size Of The Insights Response: Formatted Dicts vs Numeric Row Tuples vs Columnar
+#
+#   bench --site your-site-name execute insightly.benchmarks.payload.run
+#   bench --site your-site-name execute insightly.benchmarks.payload.run --kwargs "{'parties': 20000}"
+#
+# Uses synthetic aggregates, so only the formatting and serialisation cost is measured.
+
+import json
+import random
+import time
+
+import frappe
+from frappe.utils import fmt_money
+
+from insightly.insights.cycles import CYCLES
+from insightly.insights.party_insights import get_insights_columns, get_insights_row, to_columnar
+
+
+def run(parties=5000, party_type="Customer", seed=42):
+    cycle = CYCLES[party_type]
+    party_rows, aggregates = make_synthetic_data(cycle, parties, random.Random(seed))
+    default_currency = frappe.defaults.get_global_default("currency") or "INR"
+
+    results = {}
+    for label, build in {
+        "formatted_dicts": lambda: [
+            build_formatted_row(cycle, party, aggregates[party.name]) for party in party_rows
+        ],
+        "numeric_rows": lambda: build_numeric_rows(cycle, party_rows, aggregates, default_currency),
+        "columnar": lambda: to_columnar(build_numeric_rows(cycle, party_rows, aggregates, default_currency)),
+    }.items():
+        started = time.process_time()
+        payload = build()
+        built = time.process_time()
+        body = json.dumps(payload, separators=(",", ":"), default=str)
+        serialised = time.process_time()
+
+        results[label] = {
+            "build_cpu_ms": round((built - started) * 1000, 2),
+            "serialise_cpu_ms": round((serialised - built) * 1000, 2),
+            "payload_bytes": len(body.encode()),
+        }
+
+    for label in ("numeric_rows", "columnar"):
+        results[f"saved_by_{label}"] = {
+            key: f"{(1 - results[label][key] / results['formatted_dicts'][key]) * 100:.1f}%"
+            for key in ("build_cpu_ms", "serialise_cpu_ms", "payload_bytes")
+            if results["formatted_dicts"][key]
+        }
+
+    print(json.dumps({"parties": parties, "party_type": party_type, **results}, indent=2))
+    return results
+
+
+def build_numeric_rows(cycle, party_rows, aggregates, default_currency):
+    return {
+        "total": len(party_rows),
+        "page": 1,
+        "page_length": len(party_rows),
+        "columns": get_insights_columns(cycle),
+        "rows": [get_insights_row(cycle, party, aggregates[party.name], default_currency) for party in party_rows],
+    }
+
+
+def make_synthetic_data(cycle, parties, rng):
+    party_rows, aggregates = [], {}
+    for idx in range(parties):
+        name = f"BENCH-{cycle.party_type.upper()}-{idx:06d}"
+        party_rows.append(frappe._dict({
+            "name": name,
+            cycle.party_name_field: f"Benchmark {cycle.party_type} {idx}",
+            cycle.currency_field: None,
+            "mobile_no": f"+91 98{idx:08d}",
+            "email_id": f"party{idx}@example.com",
+        }))
+
+        aggregates[name] = {}
+        for source in cycle.sources:
+            if rng.random() < 0.2:
+                continue
+            data = {"total_records": rng.randint(1, 200)}
+            data.update({field: rng.uniform(100, 1_000_000) for field in source.fields})
+            aggregates[name][source.key] = data
+
+    return party_rows, aggregates
+
+
+def build_formatted_row(cycle, party, aggregates):
+    # The previous response shape: one dict per party with fmt_money strings per doctype
+    def format_data(data):
+        if data and data["total_records"]:
+            result = {
+                "total_records": data["total_records"],
+                "total_amount": fmt_money(data["total_amount"] or 0),
+                "total_qty": int(data.get("total_qty", 0)),
+                "paid_amount": fmt_money(data.get("paid_amount", 0)),
+                "pending_amount": fmt_money(data.get("pending_amount", 0)),
+            }
+            if "total_taxable_amount" in data:
+                result["total_taxable_amount"] = fmt_money(data["total_taxable_amount"] or 0)
+
+            return result
+        return None
+
+    return {
+        f"{frappe.scrub(cycle.party_type)}_code": party.name,
+        f"{frappe.scrub(cycle.party_type)}_name": party.get(cycle.party_name_field),
+        "mobile_no": party.mobile_no,
+        "email_id": party.email_id,
+        **{source.key: format_data(aggregates.get(source.key)) for source in cycle.sources},
+    }
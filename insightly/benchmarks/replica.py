@@ -0,0 +1,76 @@
+# Load On The Primary With And Without Replica Routing
+#
+#   bench --site your-site-name execute insightly.benchmarks.replica.run
+#   bench --site your-site-name run-insights-benchmark --replica --output replica.json
+#
+# Runs the benchmark suite's cases twice, with "insightly_read_from_replica" off and on, and records the
+# statements and storage engine row reads the primary served during each run. These are server-wide status
+# counters, so run it while the site is otherwise quiet. Needs "replica_host" in site_config.json.
+
+import json
+import time
+
+import frappe
+from frappe.utils import cint, now
+
+from insightly.benchmarks.suite import run_cases
+from insightly.insights import db
+
+
+def run(repeat=3, output=None):
+    if not frappe.conf.get("replica_host"):
+        frappe.throw(frappe._("Set replica_host in site_config.json to benchmark replica routing"))
+
+    conf = frappe._dict(frappe.conf)
+    frappe.conf.insightly_cache_ttl = 0
+    runs = {}
+    try:
+        for label, routed in (("primary", 0), ("replica", 1)):
+            frappe.conf.insightly_read_from_replica = routed
+            db.close_replica()
+            frappe.cache().delete_value(db.REPLICA_STATUS_KEY)
+
+            before = get_primary_load()
+            started = time.perf_counter()
+            cases = run_cases(cint(repeat) or 1)
+            elapsed = (time.perf_counter() - started) * 1000
+            after = get_primary_load()
+
+            runs[label] = {
+                "database": "primary" if db.get_connection() is frappe.db else "replica",
+                "elapsed_ms": round(elapsed, 2),
+                "primary_statements": after["statements"] - before["statements"],
+                "primary_rows_read": after["rows_read"] - before["rows_read"],
+                "cases": cases,
+            }
+    finally:
+        db.close_replica()
+        for key in ("insightly_cache_ttl", "insightly_read_from_replica"):
+            frappe.conf.pop(key, None)
+        frappe.conf.update(conf)
+
+    if runs["replica"]["database"] != "replica":
+        print("Replica unavailable or lagging, the second run also used the primary")
+
+    for label, result in runs.items():
+        print(f"{label:<10} {result['elapsed_ms']:>12} ms {result['primary_statements']:>10} statements "
+            f"{result['primary_rows_read']:>14} rows read on the primary")
+
+    result = {"timestamp": now(), "repeat": cint(repeat), "runs": runs}
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+
+    return result
+
+
+def get_primary_load():
+    status = frappe.db.sql("""
+        SHOW GLOBAL STATUS
+        WHERE Variable_name = 'Questions' OR Variable_name LIKE 'Handler_read%%'
+    """)
+
+    return {
+        "statements": sum(cint(value) for name, value in status if name == "Questions"),
+        "rows_read": sum(cint(value) for name, value in status if name.startswith("Handler_read")),
+    }
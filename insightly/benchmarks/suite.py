@@ -0,0 +1,158 @@
+# Benchmark Suite: Every Insights And Drill-Down Endpoint For Every Date Range Preset
+#
+#   bench --site your-site-name run-insights-benchmark --scale 10k --output before.json
+#   bench --site your-site-name run-insights-benchmark --output after.json --compare before.json
+#   bench run-insights-benchmark --offline --scale 1k
+#
+# Timings are taken with the insights cache disabled. --scale generates synthetic data first
+# (see insightly.benchmarks.synthetic), --offline runs against the SQLite stand-in of frappe.db
+# (see insightly.benchmarks.offline) instead of a site.
+
+import json
+import time
+
+import frappe
+from frappe.utils import cint, now
+
+from insightly.insights import db
+from insightly.insights.cycles import CYCLES
+from insightly.insights.dates import get_window_conditions, get_window_values
+from insightly.insights.party_insights import DATE_RANGES, get_date_range
+
+PAGE_MODULES = {
+    "Customer": "insightly.insightly.page.customer_insights.customer_insights",
+    "Supplier": "insightly.insightly.page.supplier_insights.supplier_insights",
+}
+
+
+def run(scale=None, repeat=3, output=None, offline=False, path=":memory:", compare_with=None):
+    if offline:
+        from insightly.benchmarks.offline import offline_site
+
+        with offline_site(path):
+            return run_suite(scale, repeat, output, "offline", compare_with)
+
+    return run_suite(scale, repeat, output, frappe.local.site, compare_with)
+
+
+def run_suite(scale, repeat, output, mode, compare_with=None):
+    if scale:
+        from insightly.benchmarks.synthetic import generate
+
+        generate(scale)
+
+    # Measure the queries, not Redis
+    conf = frappe._dict(frappe.conf)
+    frappe.conf.insightly_cache_ttl = 0
+    try:
+        cases = run_cases(cint(repeat) or 1)
+    finally:
+        frappe.conf.pop("insightly_cache_ttl", None)
+        frappe.conf.update(conf)
+
+    result = {
+        "mode": mode,
+        "scale": scale,
+        "repeat": cint(repeat),
+        "timestamp": now(),
+        "parties": {party_type: db.sql(f"SELECT COUNT(*) FROM `tab{party_type}`")[0][0] for party_type in CYCLES},
+        "cases": cases,
+    }
+
+    output = output or f"insightly-benchmark-{mode}-{now().replace(' ', '_').replace(':', '-')[:19]}.json"
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+    print(f"Saved {len(cases)} cases to {output}")
+
+    if compare_with:
+        compare(compare_with, output)
+
+    return result
+
+
+def run_cases(repeat):
+    cases = []
+    for party_type, cycle in CYCLES.items():
+        module = frappe.get_module(PAGE_MODULES[party_type])
+        insights = getattr(module, f"get_{party_type.lower()}_insights")
+
+        trends = getattr(module, f"get_{party_type.lower()}_trends")
+        ageing = getattr(module, f"get_{party_type.lower()}_ageing")
+        # Sparklines of one page of parties
+        parties = db.sql_list(f"SELECT name FROM `tab{party_type}` ORDER BY name LIMIT 100")
+
+        for preset in DATE_RANGES:
+            filters = {"date_range": preset}
+            cases.append(time_case(f"{insights.__name__}", preset, repeat, lambda: insights(filters)))
+            cases.append(time_case(f"{trends.__name__}", preset, repeat, lambda: trends(parties, filters)))
+            cases.append(time_case(f"{ageing.__name__}", preset, repeat, lambda: ageing(filters)))
+
+            # Drill-downs of the party with the most documents of each doctype in the range
+            start_date, end_date = get_date_range(frappe._dict(filters))
+            for source in cycle.sources:
+                party = get_busiest_party(party_type, source, start_date, end_date)
+                if not party:
+                    continue
+
+                detail = getattr(module, f"get_{frappe.scrub(source.doctype)}_data")
+                cases.append(time_case(
+                    detail.__name__, preset, repeat,
+                    lambda: detail(party, start_date, end_date),
+                    party=party,
+                ))
+
+    return cases
+
+
+def time_case(name, preset, repeat, call, **extra):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = call()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    case = {
+        "case": f"{name} / {preset}",
+        "min_ms": round(min(timings), 2),
+        "avg_ms": round(sum(timings) / len(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "rows": len(response.get("rows") or response.get("series") or []) if isinstance(response, dict) else None,
+        "payload_bytes": len(json.dumps(response, default=str)),
+        **extra,
+    }
+    print(f"{case['case']:<60} {case['avg_ms']:>10} ms")
+    return case
+
+
+def get_busiest_party(party_type, source, start_date, end_date):
+    party = db.sql(f"""
+        SELECT party
+        FROM `tabInsightly Party Rollup`
+        WHERE party_type = %(party_type)s
+            AND reference_doctype = %(reference_doctype)s
+            AND {get_window_conditions("posting_date")}
+        GROUP BY party
+        ORDER BY SUM(record_count) DESC
+        LIMIT 1
+    """, {"party_type": party_type, "reference_doctype": source.doctype, **get_window_values(start_date, end_date)})
+
+    return party[0][0] if party else None
+
+
+def compare(baseline, current):
+    # Average Time Of Every Case Against A Baseline Result File
+    with open(baseline) as f:
+        before = {case["case"]: case for case in json.load(f)["cases"]}
+    with open(current) as f:
+        after = {case["case"]: case for case in json.load(f)["cases"]}
+
+    comparison = []
+    for name, case in after.items():
+        if name not in before:
+            continue
+
+        ratio = case["avg_ms"] / before[name]["avg_ms"] if before[name]["avg_ms"] else None
+        comparison.append({"case": name, "before_ms": before[name]["avg_ms"], "after_ms": case["avg_ms"], "ratio": ratio})
+        print(f"{name:<60} {before[name]['avg_ms']:>10} -> {case['avg_ms']:>10} ms  x{ratio:.2f}" if ratio else name)
+
+    return comparison
@@ -0,0 +1,186 @@
+# Synthetic Customers, Suppliers And Their Sales / Purchase Cycle Documents For The Benchmark Suite
+#
+#   bench --site your-site-name execute insightly.benchmarks.synthetic.generate --kwargs "{'scale': '10k'}"
+#   bench --site your-site-name execute insightly.benchmarks.synthetic.cleanup
+#
+# Rows are bulk inserted with raw SQL (only the columns Insightly reads plus the standard ones) and named with the
+# BENCH- prefix, so cleanup() can remove them again. The Insightly Party Rollup is rebuilt afterwards.
+# Never run this on a production site.
+
+import random
+
+import frappe
+from frappe.utils import add_days, cint, flt, getdate, now, nowdate
+
+from insightly.insights.cycles import CYCLES
+from insightly.insights.rollup import rebuild_party_rollup
+
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000}
+PREFIX = "BENCH"
+
+# Parties whose documents are generated and inserted together
+PARTY_CHUNK_SIZE = 200
+INSERT_CHUNK_SIZE = 1000
+
+
+def generate(scale="1k", days=365, documents_per_party=4, lines_per_document=5, items=2000, seed=42):
+    # With the defaults, "100k" writes 200k parties, 4M documents and 12M item lines
+    parties = SCALES.get(scale) or cint(scale)
+    rng = random.Random(seed)
+    context = frappe._dict(
+        rng=rng,
+        days=cint(days),
+        today=getdate(nowdate()),
+        timestamp=now(),
+        user=frappe.session.user,
+        documents_per_party=cint(documents_per_party),
+        lines_per_document=cint(lines_per_document),
+        catalogue=[(f"{PREFIX}-ITEM-{idx:05d}", f"Benchmark Item {idx}") for idx in range(cint(items))],
+    )
+
+    for party_type, cycle in CYCLES.items():
+        names = [f"{PREFIX}-{party_type.upper()}-{idx:06d}" for idx in range(parties)]
+        insert_rows(party_type, [get_party_row(cycle, name, context) for name in names])
+
+        for start in range(0, len(names), PARTY_CHUNK_SIZE):
+            for source in cycle.sources:
+                documents, lines = [], []
+                for party in names[start:start + PARTY_CHUNK_SIZE]:
+                    for seq in range(context.documents_per_party):
+                        document, document_lines = get_document_rows(party_type, source, party, seq, context)
+                        documents.append(document)
+                        lines += document_lines
+
+                insert_rows(source.doctype, documents)
+                if source.detail.get("child_doctype"):
+                    insert_rows(source.detail.child_doctype, lines)
+
+            frappe.db.commit()
+
+    rebuild_party_rollup()
+    frappe.db.commit()
+
+    return {
+        "parties": parties * len(CYCLES),
+        "documents": sum(parties * context.documents_per_party * len(cycle.sources) for cycle in CYCLES.values()),
+    }
+
+
+def cleanup():
+    # Removing Every BENCH- Row And Rebuilding The Rollup From The Remaining Documents
+    for party_type, cycle in CYCLES.items():
+        for source in cycle.sources:
+            if source.detail.get("child_doctype"):
+                frappe.db.sql(f"DELETE FROM `tab{source.detail.child_doctype}` WHERE parent LIKE %s", f"{PREFIX}-%")
+            frappe.db.sql(f"DELETE FROM `tab{source.doctype}` WHERE name LIKE %s", f"{PREFIX}-%")
+        frappe.db.sql(f"DELETE FROM `tab{party_type}` WHERE name LIKE %s", f"{PREFIX}-%")
+
+    rebuild_party_rollup()
+    frappe.db.commit()
+
+
+def get_party_row(cycle, name, context):
+    idx = cint(name.rsplit("-", 1)[-1])
+    return {
+        **get_standard_values(name, context),
+        cycle.party_name_field: f"Benchmark {cycle.party_type} {idx}",
+        cycle.group_field: f"Benchmark Group {'ABC'[idx % 3]}",
+        "mobile_no": f"+1555{idx:07d}",
+        "email_id": f"{name.lower()}@example.com",
+    }
+
+
+def get_document_rows(party_type, source, party, seq, context):
+    # One Submitted (occasionally cancelled) Document Of A Source Doctype, With Its Item Lines
+    rng = context.rng
+    name = f"{PREFIX}-{frappe.scrub(source.doctype).upper()}-{party_type[0]}-{party.rsplit('-', 1)[-1]}-{seq}"
+    date = add_days(context.today, -rng.randint(0, context.days))
+    timestamp = f"{date} {rng.randint(8, 19):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+
+    document = {
+        **get_standard_values(name, context),
+        "creation": timestamp,
+        "docstatus": 2 if rng.random() < 0.05 else 1,
+        source.party_field: party,
+    }
+    if source.get("party_type_field"):
+        document[source.party_type_field] = party_type
+    document[source.date_field] = date
+
+    lines = []
+    if source.detail.get("child_doctype"):
+        for line in range(context.lines_per_document):
+            item_code, item_name = rng.choice(context.catalogue)
+            qty = rng.randint(1, 50)
+            rate = round(rng.uniform(5, 500), 2)
+            row = {
+                **get_standard_values(f"{name}-{line}", context),
+                "parent": name,
+                "parenttype": source.doctype,
+                "parentfield": "items",
+                "idx": line + 1,
+                "item_code": item_code,
+                "item_name": item_name,
+                "qty": qty,
+                "rate": rate,
+                "amount": flt(qty * rate, 2),
+            }
+            if source.detail.get("pending_qty_field"):
+                row[source.detail.pending_qty_field] = rng.randint(0, qty)
+            lines.append(row)
+
+        total = flt(sum(row["amount"] for row in lines), 2)
+        document.update({"total": total, "grand_total": flt(total * 1.18, 2), "total_qty": sum(row["qty"] for row in lines)})
+        if "outstanding" in source.columns:
+            document["outstanding_amount"] = flt(document["grand_total"] * rng.choice([0, 0, 0.25, 0.5, 1]), 2)
+        if source.get("due_date_field"):
+            document[source.due_date_field] = add_days(date, rng.choice([0, 15, 30, 60]))
+    else:
+        document.update(get_payment_values(party_type, source, rng))
+
+    return document, lines
+
+
+def get_payment_values(party_type, source, rng):
+    amount = round(rng.uniform(100, 50000), 2)
+    if source.doctype == "Payment Request":
+        invoice = "Sales Invoice" if party_type == "Customer" else "Purchase Invoice"
+        return {
+            "grand_total": amount,
+            "payment_request_type": "Inward" if party_type == "Customer" else "Outward",
+            "reference_doctype": invoice,
+            "reference_name": f"{PREFIX}-{invoice.upper().replace(' ', '-')}-{rng.randint(0, 99999)}",
+        }
+
+    return {
+        "paid_amount": amount,
+        "unallocated_amount": amount if rng.random() < 0.2 else 0,
+        "payment_type": "Receive" if party_type == "Customer" else "Pay",
+        "mode_of_payment": rng.choice(["Cash", "Bank Draft", "Wire Transfer", "Credit Card"]),
+        "reference_no": f"REF-{rng.randint(100000, 999999)}",
+    }
+
+
+def get_standard_values(name, context):
+    return {
+        "name": name,
+        "creation": context.timestamp,
+        "modified": context.timestamp,
+        "owner": context.user,
+        "modified_by": context.user,
+    }
+
+
+def insert_rows(doctype, rows):
+    # Multi-Row INSERTs In Chunks; every row of a call has the same columns
+    if not rows:
+        return
+
+    columns = list(rows[0])
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + INSERT_CHUNK_SIZE]
+        placeholders = ", ".join(f"({', '.join(['%s'] * len(columns))})" for _ in chunk)
+        frappe.db.sql(
+            f"INSERT INTO `tab{doctype}` ({', '.join(f'`{column}`' for column in columns)}) VALUES {placeholders}",
+            [row.get(column) for row in chunk for column in columns],
+        )
@@ -0,0 +1,62 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-insights-rollup")
+@click.option("--party-type", "party_types", multiple=True, help="Only rebuild Customer or Supplier rows")
+@click.option("--doctype", "doctypes", multiple=True, help="Only rebuild rows of this transaction doctype")
+@pass_context
+def rebuild_insights_rollup(context, party_types=None, doctypes=None):
+    "Rebuild the Insightly Party Rollup table from submitted transactions"
+    import frappe
+    from insightly.insights.cache import clear_insights_cache
+    from insightly.insights.rollup import rebuild_party_rollup
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        rebuild_party_rollup(party_types=party_types or None, doctypes=doctypes or None)
+        frappe.db.commit()
+        clear_insights_cache()
+    finally:
+        frappe.destroy()
+
+    click.echo(f"Rebuilt Insightly Party Rollup for {site}")
+
+
+@click.command("run-insights-benchmark")
+@click.option("--scale", help="Generate synthetic data first: 1k, 10k, 100k or a number of parties per party type")
+@click.option("--repeat", default=3, type=int, help="Runs per case, timings are averaged")
+@click.option("--output", help="JSON result file")
+@click.option("--compare", "compare_with", help="Earlier JSON result file to compare against")
+@click.option("--offline", is_flag=True, help="Run against a SQLite stand-in of the database instead of a site")
+@click.option("--db-path", default=":memory:", help="SQLite file used by --offline")
+@click.option("--replica", is_flag=True, help="Compare the primary's load with and without read replica routing")
+@pass_context
+def run_insights_benchmark(
+    context, scale=None, repeat=3, output=None, compare_with=None, offline=False, db_path=":memory:", replica=False
+):
+    "Time the Insightly insights and drill-down endpoints for every date range preset"
+    import frappe
+    from insightly.benchmarks.suite import run
+
+    if offline:
+        run(scale=scale, repeat=repeat, output=output, offline=True, path=db_path, compare_with=compare_with)
+        return
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        if replica:
+            from insightly.benchmarks.replica import run as run_replica
+
+            run_replica(repeat=repeat, output=output)
+        else:
+            run(scale=scale, repeat=repeat, output=output, compare_with=compare_with)
+    finally:
+        frappe.destroy()
+
+
+commands = [rebuild_insights_rollup, run_insights_benchmark]
@@ -8,7 +8,8 @@ app_license = "mit"
 # Apps
 # ------------------
 
-# required_apps = []
+# Customer, Supplier and the transaction doctypes rolled up per party come from ERPNext
+required_apps = ["erpnext"]
 
 # Each item in the list will be shown as an app in the apps page
 # add_to_apps_screen = [
@@ -41,6 +42,10 @@ app_license = "mit"
 
 # include js in page
 # page_js = {"page" : "public/js/file.js"}
+page_js = {
+	"customer-insights": ["public/js/virtual_table.js", "public/js/party_insights.js"],
+	"supplier-insights": ["public/js/virtual_table.js", "public/js/party_insights.js"],
+}
 
 # include js in doctype views
 # doctype_js = {"doctype" : "public/js/doctype.js"}
@@ -83,7 +88,7 @@ app_license = "mit"
 # ------------
 
 # before_install = "insightly.install.before_install"
-# after_install = "insightly.install.after_install"
+after_install = "insightly.install.after_install"
 
 # Uninstallation
 # ------------
@@ -91,6 +96,22 @@ app_license = "mit"
 # before_uninstall = "insightly.uninstall.before_uninstall"
 # after_uninstall = "insightly.uninstall.after_uninstall"
 
+# Migration
+# ------------
+
+after_migrate = [
+	"insightly.insights.indexes.check_insights_indexes",
+	"insightly.insights.directory.clear_party_directories",
+]
+
+# Adds X-Insightly-Timing to profiled responses (see insightly.insights.profiling) and closes the replica
+# connection of the analytics queries (see insightly.insights.db)
+after_request = [
+	"insightly.insights.profiling.add_timing_header",
+	"insightly.insights.db.close_replica",
+]
+after_job = ["insightly.insights.db.close_replica"]
+
 # Integration Setup
 # ------------------
 # To set up dependencies/integrations with other apps
@@ -145,6 +166,51 @@ app_license = "mit"
 # 	}
 # }
 
+doc_events = {
+	doctype: {
+		"on_submit": [
+			"insightly.insights.rollup.update_party_rollup",
+			"insightly.insights.cache.clear_party_cache",
+			"insightly.insights.live.publish_party_updates",
+		],
+		"on_cancel": [
+			"insightly.insights.rollup.update_party_rollup",
+			"insightly.insights.cache.clear_party_cache",
+			"insightly.insights.live.publish_party_updates",
+		],
+	}
+	for doctype in [
+		"Sales Order",
+		"Delivery Note",
+		"Sales Invoice",
+		"Purchase Order",
+		"Purchase Receipt",
+		"Purchase Invoice",
+		"Payment Request",
+		"Payment Entry",
+		"Journal Entry",
+	]
+}
+
+# Reconciliation and advance allocation change outstanding amounts through ledger entries only; pages see those
+# changes on their next delta refresh rather than as a pushed update
+doc_events["Payment Ledger Entry"] = {
+	"on_submit": [
+		"insightly.insights.rollup.update_party_rollup",
+		"insightly.insights.cache.clear_party_cache",
+	],
+}
+
+# Party changes replace the cached party directory (names, contacts and groups behind the grid and typeahead)
+doc_events.update({
+	party_type: {
+		"on_update": "insightly.insights.directory.clear_party_directory",
+		"after_rename": "insightly.insights.directory.clear_party_directory",
+		"on_trash": "insightly.insights.directory.clear_party_directory",
+	}
+	for party_type in ["Customer", "Supplier"]
+})
+
 # Scheduled Tasks
 # ---------------
 
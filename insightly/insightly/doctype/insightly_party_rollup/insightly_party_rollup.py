@@ -0,0 +1,17 @@
+# Copyright (c) 2025, Meet Sherasiya and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class InsightlyPartyRollup(Document):
+    pass
+
+
+def on_doctype_update():
+    # Insights read the rollup by party type and date range, then group by party
+    frappe.db.add_index("Insightly Party Rollup", ["party_type", "posting_date", "party"])
+
+    # Delta refreshes look up rows changed since the page's watermark
+    frappe.db.add_index("Insightly Party Rollup", ["party_type", "modified"])
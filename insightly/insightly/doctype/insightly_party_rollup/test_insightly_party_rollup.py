@@ -0,0 +1,71 @@
+# Copyright (c) 2025, Meet Sherasiya and contributors
+# See license.txt
+
+import frappe
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, getdate, nowdate
+
+from insightly.insights.rollup import ROLLUP_COLUMNS, ROLLUP_DOCTYPE, get_rollup_name, refresh_queued_rollups
+
+test_dependencies = ["Customer", "Item", "Warehouse"]
+
+# A day no other test posts invoices on, so the row only holds this test's documents
+POSTING_DATE = add_days(nowdate(), -400)
+
+
+class TestInsightlyPartyRollup(FrappeTestCase):
+    def test_submit_return_and_cancel(self):
+        invoice = make_invoice(qty=4, rate=100)
+        self.assertRollupMatches(record_count=1, grand_total=400)
+
+        sales_return = make_invoice(qty=-1, rate=100, is_return=1, return_against=invoice.name)
+        self.assertRollupMatches(record_count=2, grand_total=300)
+
+        sales_return.cancel()
+        self.assertRollupMatches(record_count=1, grand_total=400)
+
+        invoice.reload()
+        invoice.cancel()
+        self.assertRollupMatches(record_count=0, grand_total=0)
+
+    def test_settled_by_journal_entry(self):
+        invoice = make_invoice(qty=4, rate=100)
+
+        journal_entry = frappe.new_doc("Journal Entry")
+        journal_entry.update({"company": invoice.company, "posting_date": POSTING_DATE})
+        journal_entry.append("accounts", {
+            "account": invoice.debit_to,
+            "party_type": "Customer",
+            "party": "_Test Customer",
+            "credit_in_account_currency": 100,
+            "reference_type": "Sales Invoice",
+            "reference_name": invoice.name,
+        })
+        journal_entry.append("accounts", {"account": "Cash - _TC", "debit_in_account_currency": 100})
+        journal_entry.submit()
+        self.assertRollupMatches(record_count=1, outstanding=300)
+
+        journal_entry.cancel()
+        self.assertRollupMatches(record_count=1, outstanding=400)
+
+    def assertRollupMatches(self, **expected):
+        # The queued rows are recomputed after commit; tests roll back, so the refresh is run directly
+        refresh_queued_rollups()
+        name = get_rollup_name("Customer", "_Test Customer", "Sales Invoice", getdate(POSTING_DATE))
+        row = frappe.db.get_value(ROLLUP_DOCTYPE, name, ROLLUP_COLUMNS, as_dict=True)
+
+        source = frappe.db.sql("""
+            SELECT COUNT(*) AS record_count, SUM(grand_total) AS grand_total, SUM(outstanding_amount) AS outstanding
+            FROM `tabSales Invoice`
+            WHERE docstatus = 1 AND customer = '_Test Customer' AND posting_date = %s
+        """, POSTING_DATE, as_dict=True)[0]
+
+        for column, value in expected.items():
+            self.assertEqual(row[column], value)
+        self.assertEqual(row.outstanding, source.outstanding or 0)
+        self.assertEqual(row.record_count, source.record_count)
+
+
+def make_invoice(**args):
+    return create_sales_invoice(customer="_Test Customer", posting_date=POSTING_DATE, **args)
@@ -0,0 +1,140 @@
+import frappe
+from frappe.utils import cint, flt
+
+from insightly.insights import db
+from insightly.insights.cache import get_cached_result
+from insightly.insights.dates import get_date_window
+from insightly.insights.party_insights import get_date_range, get_party_details_map
+
+# Ageing Buckets: (fieldname, label, lowest age, highest age) in days past the due date
+# Invoices not due yet count towards the first bucket, as in ERPNext's ageing reports
+AGEING_BUCKETS = [
+    ("age_0_30", "0-30", None, 30),
+    ("age_31_60", "31-60", 31, 60),
+    ("age_61_90", "61-90", 61, 90),
+    ("age_90_plus", "90+", 91, None),
+]
+
+AGEING_SORT_FIELDS = ("party", "invoice_count", "total_outstanding", *[bucket[0] for bucket in AGEING_BUCKETS])
+
+
+def get_party_ageing(cycle, filters, page=1, page_length=20, order_by=None):
+    # Shared Implementation Of get_customer_ageing / get_supplier_ageing
+    # Receivable / payable ageing of the outstanding invoices posted up to the end of the date range, aged at
+    # that date. One page of parties with the totals of all of them:
+    # {"total", "page", "page_length", "as_of", "buckets", "columns", "rows", "totals"}
+    filters = frappe.parse_json(filters)
+    end_date = get_date_range(filters)[1]
+
+    args = frappe._dict(
+        filters=filters,
+        as_of=str(end_date),
+        page=max(cint(page), 1),
+        page_length=min(cint(page_length) or 20, 500),
+        order_by=order_by or "total_outstanding desc",
+    )
+
+    return get_cached_result(
+        "get_party_ageing", cycle.party_type, args, filters.get("party"),
+        lambda: build_party_ageing(cycle, args),
+    )
+
+
+def build_party_ageing(cycle, args):
+    source = get_ageing_source(cycle)
+    outstanding = f"d.{source.columns['outstanding']}"
+    filters = args.filters
+    sort_field, sort_order = parse_ageing_order(args.order_by)
+
+    values = {
+        "as_of": args.as_of,
+        "parties": tuple(filters.get("party") or ()),
+        "party_group": filters.get("party_group"),
+        "start": (args.page - 1) * args.page_length,
+        "page_length": args.page_length,
+        # Invoices posted up to and including the as-of date
+        "to_date": get_date_window(args.as_of, args.as_of)[1],
+    }
+
+    # One grouped pass over the open invoices, each outstanding amount summed into its age bucket
+    age = f"DATEDIFF(%(as_of)s, d.{source.due_date_field})"
+    buckets = []
+    for fieldname, _, lowest, highest in AGEING_BUCKETS:
+        condition = " AND ".join(
+            f"{age} {operator} {days}" for operator, days in ((">=", lowest), ("<=", highest)) if days is not None
+        )
+        buckets.append(f"SUM(CASE WHEN {condition} THEN {outstanding} ELSE 0 END) AS {fieldname}")
+
+    conditions = ["d.docstatus = 1", f"{outstanding} != 0", f"d.{source.date_field} < %(to_date)s"]
+    if filters.get("party"):
+        conditions.append(f"d.{source.party_field} IN %(parties)s")
+
+    group_join = ""
+    if filters.get("party_group"):
+        group_join = f"INNER JOIN `tab{cycle.party_type}` p ON p.name = d.{source.party_field} AND p.{cycle.group_field} = %(party_group)s"
+
+    ageing = f"""
+        SELECT d.{source.party_field} AS party, COUNT(*) AS invoice_count, {", ".join(buckets)},
+            SUM({outstanding}) AS total_outstanding
+        FROM `tab{source.doctype}` d
+        {group_join}
+        WHERE {" AND ".join(conditions)}
+        GROUP BY d.{source.party_field}
+    """
+
+    summary = db.sql(f"""
+        SELECT COUNT(*) AS total, SUM(invoice_count) AS invoice_count,
+            {", ".join(f"SUM({field}) AS {field}" for field in AGEING_SORT_FIELDS[2:])}
+        FROM ({ageing}) t
+    """, values, as_dict=True)[0]
+
+    rows = db.sql(f"""
+        {ageing}
+        ORDER BY {sort_field} {sort_order}{", party ASC" if sort_field != "party" else ""}
+        LIMIT %(page_length)s OFFSET %(start)s
+    """, values, as_dict=True)
+
+    parties = get_party_details_map(cycle, [row.party for row in rows])
+    default_currency = frappe.db.get_default("currency")
+
+    return {
+        "total": cint(summary.total),
+        "page": args.page,
+        "page_length": args.page_length,
+        "as_of": args.as_of,
+        "buckets": [[fieldname, label] for fieldname, label, _, _ in AGEING_BUCKETS],
+        "columns": get_ageing_columns(cycle),
+        "rows": [get_ageing_row(cycle, parties.get(row.party), row, default_currency) for row in rows],
+        "totals": {field: flt(summary[field]) for field in AGEING_SORT_FIELDS[1:]},
+    }
+
+
+def get_ageing_columns(cycle):
+    return ["party", "party_name", *cycle.contact_fields, "currency", *AGEING_SORT_FIELDS[1:]]
+
+
+def get_ageing_row(cycle, party, ageing, default_currency=None):
+    party = party or frappe._dict(name=ageing.party)
+    return [
+        ageing.party,
+        party.get(cycle.party_name_field),
+        *[party.get(field) for field in cycle.contact_fields],
+        party.get(cycle.currency_field) or default_currency,
+        cint(ageing.invoice_count),
+        *[flt(ageing[field]) for field in AGEING_SORT_FIELDS[2:]],
+    ]
+
+
+def get_ageing_source(cycle):
+    # The Invoice Doctype, The Source With A Due Date
+    return next(source for source in cycle.sources if source.get("due_date_field"))
+
+
+def parse_ageing_order(order_by):
+    # Validating "<field> [asc|desc]" Against The Ageing Columns
+    parts = order_by.split()
+    sort_order = parts[1].upper() if len(parts) > 1 else "DESC"
+    if parts[0] not in AGEING_SORT_FIELDS or sort_order not in ("ASC", "DESC"):
+        frappe.throw(frappe._("Cannot sort ageing by {0}").format(order_by))
+
+    return parts[0], sort_order
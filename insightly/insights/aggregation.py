@@ -0,0 +1,184 @@
+import frappe
+from frappe.utils import add_to_date
+
+from insightly.insights import db
+from insightly.insights.dates import get_window_conditions, get_window_values
+
+
+# Aggregates Computed From The Insightly Party Rollup Columns (summed per party)
+ROLLUP_FIELDS = {
+    "total_records": "record_count",
+    "total_taxable_amount": "total",
+    "total_amount": "grand_total",
+    "total_qty": "qty",
+    "paid_amount": "grand_total - outstanding",
+    "pending_amount": "outstanding",
+}
+
+# Rollup rows are stamped with `modified` before their transaction commits, so a row can become visible after a
+# newer watermark was handed out; the watermark is moved back by this many seconds so such rows are still picked up
+WATERMARK_MARGIN = 30
+
+
+def get_party_aggregates(cycle, start_date, end_date, parties=None, previous_dates=None):
+    # Rolling Up Every Source Doctype For The Given Parties From The Daily Rollup In One Query
+    # Returns {party: {source_key: {"total_records": ..., <field>: ...}}}
+    # With previous_dates (start, end) both periods are summed in the same scan and every field also gets
+    # "previous_<field>" and "<field>_delta"
+    aggregates = {}
+
+    if parties is not None and not parties:
+        return aggregates
+
+    sources_by_doctype = {source.doctype: source for source in cycle.sources}
+    if previous_dates:
+        current, previous = get_window_conditions("posting_date"), get_window_conditions("posting_date", "previous_")
+        fields = ", ".join(
+            f"SUM(CASE WHEN {current} THEN {expression} ELSE 0 END) AS {alias}, "
+            f"SUM(CASE WHEN {previous} THEN {expression} ELSE 0 END) AS previous_{alias}"
+            for alias, expression in ROLLUP_FIELDS.items()
+        )
+        having = "total_records + previous_total_records > 0"
+    else:
+        fields = ", ".join(f"SUM({expression}) AS {alias}" for alias, expression in ROLLUP_FIELDS.items())
+        having = "total_records > 0"
+
+    rows = db.sql(f"""
+        SELECT party, reference_doctype, {fields}
+        FROM `tabInsightly Party Rollup`
+        WHERE {get_rollup_conditions(parties, previous=bool(previous_dates))}
+        GROUP BY party, reference_doctype
+        HAVING {having}
+    """, get_query_values(cycle, start_date, end_date, parties, previous_dates), as_dict=True)
+
+    for row in rows:
+        source = sources_by_doctype[row.reference_doctype]
+        data = aggregates.setdefault(row.party, {})[source.key] = {}
+        for field in ["total_records", *source.fields]:
+            data[field] = row[field]
+            if previous_dates:
+                data[f"previous_{field}"] = row[f"previous_{field}"]
+                data[f"{field}_delta"] = (row[field] or 0) - (row[f"previous_{field}"] or 0)
+
+    return aggregates
+
+
+def get_ranked_parties(cycle, start_date, end_date, parties=None, party_group=None,
+        order_by=None, start=0, page_length=20, top_n=None, previous_dates=None):
+    # Ranking Parties With Any Transaction In Range And Returning One Page Of Them
+    # Ordering, top-N and limits are applied in SQL so only the requested slice is aggregated
+    # When comparing, parties active in either period are listed and sorted by the current period
+    sort_key, sort_order = parse_order_by(cycle, order_by)
+
+    values = get_query_values(cycle, start_date, end_date, parties, previous_dates)
+    values.update({"party_group": party_group, "start": start, "page_length": page_length})
+
+    sort_value = "0"
+    if sort_key:
+        values["sort_doctype"] = sort_key[0].doctype
+        in_range = f" AND {get_window_conditions('r.posting_date')}" if previous_dates else ""
+        sort_value = f"SUM(CASE WHEN r.reference_doctype = %(sort_doctype)s{in_range} THEN r.{ROLLUP_FIELDS[sort_key[1]]} ELSE 0 END)"
+
+    group_condition = f"p.{cycle.group_field} = %(party_group)s" if party_group else "1 = 1"
+    ranked_parties = f"""
+        SELECT r.party, {sort_value} AS sort_value
+        FROM `tabInsightly Party Rollup` r
+        INNER JOIN `tab{cycle.party_type}` p ON p.name = r.party
+        WHERE {get_rollup_conditions(parties, "r", bool(previous_dates))} AND {group_condition}
+        GROUP BY r.party
+        HAVING SUM(r.record_count) > 0
+    """
+
+    total = db.sql(f"SELECT COUNT(*) FROM ({ranked_parties}) t", values)[0][0]
+    if top_n:
+        total = min(total, top_n)
+        page_length = max(min(page_length, top_n - start), 0)
+
+    if not page_length or start >= total:
+        return frappe._dict(total=total, parties=[])
+
+    values["page_length"] = page_length
+    page = db.sql(f"""
+        {ranked_parties}
+        ORDER BY {"sort_value " + sort_order + ", " if sort_key else ""}r.party {"ASC" if sort_key else sort_order}
+        LIMIT %(page_length)s OFFSET %(start)s
+    """, values)
+
+    return frappe._dict(total=total, parties=[row[0] for row in page])
+
+
+def get_changed_parties(cycle, start_date, end_date, since, parties=None, party_group=None, limit=None,
+        previous_dates=None):
+    # Parties With Rollup Rows In Range (or the comparison period) Modified At Or After The Watermark
+    # Cancellations keep their zeroed rollup rows, so they show up here as well
+    values = get_query_values(cycle, start_date, end_date, parties, previous_dates)
+    values.update({"since": since, "party_group": party_group, "limit": limit})
+
+    group_join = f"INNER JOIN `tab{cycle.party_type}` p ON p.name = r.party AND p.{cycle.group_field} = %(party_group)s" if party_group else ""
+    return db.sql_list(f"""
+        SELECT DISTINCT r.party
+        FROM `tabInsightly Party Rollup` r
+        {group_join}
+        WHERE {get_rollup_conditions(parties, "r", bool(previous_dates))} AND r.modified >= %(since)s
+        {"LIMIT %(limit)s" if limit else ""}
+    """, values)
+
+
+def get_rollup_watermark(cycle):
+    # Latest Rollup Change Of The Cycle, Served By The (party_type, modified) Index, Less The Safety Margin
+    # Rows changed within the margin are sent again by the next delta refresh, which patches them idempotently
+    watermark = db.sql(
+        "SELECT MAX(modified) FROM `tabInsightly Party Rollup` WHERE party_type = %s", cycle.party_type
+    )[0][0]
+    return add_to_date(watermark, seconds=-WATERMARK_MARGIN) if watermark else None
+
+
+def parse_order_by(cycle, order_by=None):
+    # Validating "<source_key>.<field> [asc|desc]" Against The Source Definitions
+    # Returns ((source, field), order), or (None, order) when sorting by party name
+    parts = (order_by or "party").split()
+    sort_order = parts[1].upper() if len(parts) > 1 else ("ASC" if parts[0] == "party" else "DESC")
+
+    if sort_order not in ("ASC", "DESC"):
+        frappe.throw(frappe._("Invalid sort order {0}").format(parts[1]))
+
+    if parts[0] == "party":
+        return None, sort_order
+
+    source_key, _, field = parts[0].partition(".")
+    source = next((source for source in cycle.sources if source.key == source_key), None)
+    if not source or (field != "total_records" and field not in source.fields):
+        frappe.throw(frappe._("Cannot sort insights by {0}").format(parts[0]))
+
+    return (source, field), sort_order
+
+
+def get_rollup_conditions(parties=None, alias=None, previous=False):
+    # With previous the comparison window is read too, as a second range of the same index scan
+    prefix = f"{alias}." if alias else ""
+    window = get_window_conditions(f"{prefix}posting_date")
+    if previous:
+        window = f"(({window}) OR ({get_window_conditions(f'{prefix}posting_date', 'previous_')}))"
+
+    conditions = [
+        f"{prefix}party_type = %(party_type)s",
+        f"{prefix}reference_doctype IN %(doctypes)s",
+        window,
+    ]
+    if parties:
+        conditions.append(f"{prefix}party IN %(parties)s")
+
+    return " AND ".join(conditions)
+
+
+def get_query_values(cycle, start_date, end_date, parties=None, previous_dates=None):
+    values = {
+        "party_type": cycle.party_type,
+        "doctypes": tuple(source.doctype for source in cycle.sources),
+        "parties": tuple(parties or ()),
+        **get_window_values(start_date, end_date),
+    }
+    if previous_dates:
+        values.update(get_window_values(*previous_dates, prefix="previous_"))
+
+    return values
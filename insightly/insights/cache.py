@@ -0,0 +1,141 @@
+import hashlib
+import json
+import time
+
+import frappe
+from frappe.utils import cint
+
+from insightly.insights.rollup import get_affected_parties
+
+CACHE_PREFIX = "insightly|cached"
+# Sorted set of the cached keys, scored by their expiry time
+ENTRIES_KEY = f"{CACHE_PREFIX}|entries"
+STATS_KEY = "insightly|cache_stats"
+
+# Entries not restricted to a party list are tagged with this and dropped on any change of that party type
+ALL_PARTIES = "*"
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def get_cached_result(method, party_type, key_data, parties, compute):
+    # Returning A Cached Insights Result Or Computing And Storing It
+    # key_data must hold the normalized request (filters plus the resolved start/end dates)
+    ttl = cint(frappe.conf.get("insightly_cache_ttl", DEFAULT_TTL))
+    if ttl <= 0:
+        return compute()
+
+    cache = frappe.cache()
+    key = get_cache_key(method, party_type, key_data)
+
+    result = cache.get_value(key)
+    if result is not None:
+        cache.hincrby(cache.make_key(STATS_KEY), "hits", 1)
+        return result
+
+    cache.hincrby(cache.make_key(STATS_KEY), "misses", 1)
+    result = compute()
+
+    # Tag sets live as long as their newest entry; each entry keeps its tags so eviction can untag it
+    tag_keys = [get_tag_key(party_type, party) for party in parties or [ALL_PARTIES]]
+    cache.set_value(key, result, expires_in_sec=ttl)
+    cache.set_value(get_entry_tags_key(key), tag_keys, expires_in_sec=ttl)
+    for tag_key in tag_keys:
+        cache.sadd(tag_key, key)
+        cache.expire(cache.make_key(tag_key), ttl)
+    track_entry(cache, key, ttl)
+
+    return result
+
+
+def track_entry(cache, key, ttl):
+    # Keeping The Number Of Cached Results Bounded By Evicting The Entries Closest To Expiry
+    # Re-cached keys replace their score and expired ones are dropped, so the set holds live entries only
+    max_entries = cint(frappe.conf.get("insightly_cache_max_entries", DEFAULT_MAX_ENTRIES))
+    entries_key = cache.make_key(ENTRIES_KEY)
+    now = time.time()
+
+    cache.zadd(entries_key, {key: now + ttl})
+    cache.zremrangebyscore(entries_key, "-inf", now)
+    cache.expire(entries_key, ttl)
+
+    overflow = cache.zcard(entries_key) - max_entries
+    if overflow > 0:
+        evict_entries(cache, [frappe.safe_decode(oldest) for oldest, _ in cache.zpopmin(entries_key, overflow)])
+
+
+def evict_entries(cache, keys):
+    for key in keys:
+        for tag_key in cache.get_value(get_entry_tags_key(key)) or []:
+            cache.srem(tag_key, key)
+        cache.delete_value([key, get_entry_tags_key(key)])
+
+
+def clear_party_cache(doc, method=None):
+    # Doc Event: Dropping Cached Results That Include The Document's Party Once The Change Is Committed
+    parties = get_affected_parties(doc)
+
+    def invalidate():
+        for party_type, party in parties:
+            invalidate_party(party_type, party)
+
+    frappe.db.after_commit.add(invalidate)
+
+
+def invalidate_party(party_type, party):
+    if not party:
+        return
+
+    cache = frappe.cache()
+    for tag_key in (get_tag_key(party_type, party), get_tag_key(party_type, ALL_PARTIES)):
+        keys = [frappe.safe_decode(key) for key in cache.smembers(tag_key)]
+        if keys:
+            cache.delete_value(keys + [get_entry_tags_key(key) for key in keys])
+            cache.zrem(cache.make_key(ENTRIES_KEY), *keys)
+        cache.delete_value(tag_key)
+
+
+def clear_insights_cache():
+    cache = frappe.cache()
+    cache.delete_keys(CACHE_PREFIX)
+
+
+@frappe.whitelist()
+def get_cache_stats():
+    frappe.only_for("System Manager")
+
+    cache = frappe.cache()
+    # The counters are plain integers written with the raw hincrby, so they are read back unwrapped as well
+    hits, misses = (cint(value) for value in cache.hmget(cache.make_key(STATS_KEY), "hits", "misses"))
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0,
+        "entries": cache.zcount(cache.make_key(ENTRIES_KEY), time.time(), "+inf"),
+    }
+
+
+def get_cache_key(method, party_type, key_data):
+    digest = hashlib.sha1(json.dumps(normalize(key_data), sort_keys=True, default=str).encode()).hexdigest()
+    return f"{CACHE_PREFIX}|{method}|{party_type}|{digest}"
+
+
+def get_entry_tags_key(key):
+    return f"{key}|tags"
+
+
+def get_tag_key(party_type, party):
+    return f"{CACHE_PREFIX}|tag|{party_type}|{party}"
+
+
+def normalize(value):
+    # Dropping empty filters and ordering lists so equivalent requests share a cache entry
+    if isinstance(value, dict):
+        return {key: normalize(val) for key, val in value.items() if val not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        values = [normalize(val) for val in value]
+        return sorted(values, key=str)
+
+    return value
@@ -0,0 +1,187 @@
+import frappe
+
+
+# Declarative Description Of The Sales And Purchase Cycles Shown On The Insights Pages
+#
+# Each cycle names its party doctype (with its name, group, currency and contact fields) and the transaction doctypes ("sources") rolled up per party.
+# For every source:
+#   columns - Insightly Party Rollup column -> source doctype field that is summed into it
+#   fields  - aggregates shown on the insights page (see aggregation.ROLLUP_FIELDS)
+#   detail  - drill-down definition; "child_doctype" rows are grouped by "group_by", otherwise
+#             documents are listed. Expressions use "d" for the document and "c" for the child row,
+#             columns with "total" are summed in the footer. "sort_by" is the default order and
+#             "search_fields" are matched by the drill-down search box.
+#   due_date_field - set on the invoice source, whose outstanding amounts are aged (see ageing.py)
+
+
+def item_detail(child_doctype, pending_qty_field=None):
+    columns = [
+        frappe._dict(fieldname="item_code", label="Item Code", expression="c.item_code"),
+        frappe._dict(fieldname="item_name", label="Item Name", expression="c.item_name"),
+        frappe._dict(fieldname="total_qty", label="Qty", expression="SUM(c.qty)", fieldtype="Float", width="10%", total=1),
+    ]
+    if pending_qty_field:
+        columns.append(frappe._dict(
+            fieldname="pending_qty", label="Pending Qty", expression=f"SUM(c.qty - c.{pending_qty_field})",
+            fieldtype="Float", width="10%", total=1,
+        ))
+    columns += [
+        frappe._dict(fieldname="avg_rate", label="Rate", expression="AVG(c.rate)", fieldtype="Currency", width="15%"),
+        frappe._dict(fieldname="total_amount", label="Total Taxable Amount", expression="SUM(c.amount)", fieldtype="Currency", width="15%", total=1),
+    ]
+
+    return frappe._dict(
+        child_doctype=child_doctype,
+        group_by="c.item_code",
+        pending_qty_field=pending_qty_field,
+        sort_by="total_amount desc",
+        search_fields=["c.item_code", "c.item_name"],
+        columns=columns,
+    )
+
+
+def payment_request_source():
+    return frappe._dict(
+        key="payment_request",
+        doctype="Payment Request",
+        party_field="party",
+        party_type_field="party_type",
+        date_field="transaction_date",
+        columns={"grand_total": "grand_total"},
+        fields=["total_amount"],
+        detail=frappe._dict(
+            sort_by="transaction_date desc",
+            search_fields=["d.name", "d.reference_name"],
+            columns=[
+                frappe._dict(fieldname="payment_request_type", label="Payment Request Type", expression="d.payment_request_type"),
+                frappe._dict(fieldname="transaction_date", label="Transaction Date", expression="d.transaction_date", fieldtype="Date"),
+                frappe._dict(fieldname="reference_doctype", label="Reference Doctype", expression="d.reference_doctype", width="25%"),
+                frappe._dict(fieldname="reference_name", label="Reference Name", expression="d.reference_name", width="25%"),
+                frappe._dict(fieldname="grand_total", label="Total Amount", expression="d.grand_total", fieldtype="Currency", width="15%", total=1),
+            ],
+        ),
+    )
+
+
+def payment_entry_source():
+    return frappe._dict(
+        key="payment_entry",
+        doctype="Payment Entry",
+        party_field="party",
+        party_type_field="party_type",
+        date_field="posting_date",
+        columns={"grand_total": "paid_amount"},
+        fields=["total_amount"],
+        detail=frappe._dict(
+            sort_by="posting_date desc",
+            search_fields=["d.name", "d.mode_of_payment", "d.reference_no"],
+            columns=[
+                frappe._dict(fieldname="payment_type", label="Payment Type", expression="d.payment_type"),
+                frappe._dict(fieldname="posting_date", label="Transaction Date", expression="d.posting_date", fieldtype="Date"),
+                frappe._dict(fieldname="mode_of_payment", label="Mode of Payment", expression="d.mode_of_payment", width="20%"),
+                frappe._dict(fieldname="unallocated_amount", label="Unallocated Amount", expression="d.unallocated_amount", fieldtype="Currency", width="20%", total=1),
+                frappe._dict(fieldname="paid_amount", label="Paid Amount", expression="d.paid_amount", fieldtype="Currency", width="20%", total=1),
+            ],
+        ),
+    )
+
+
+SALES_CYCLE = frappe._dict(
+    party_type="Customer",
+    party_name_field="customer_name",
+    group_field="customer_group",
+    currency_field="default_currency",
+    contact_fields=["mobile_no", "email_id"],
+    sources=[
+        frappe._dict(
+            key="sales_order",
+            doctype="Sales Order",
+            party_field="customer",
+            date_field="transaction_date",
+            columns={"total": "total", "grand_total": "grand_total", "qty": "total_qty"},
+            fields=["total_taxable_amount", "total_amount", "total_qty"],
+            detail=item_detail("Sales Order Item", pending_qty_field="delivered_qty"),
+        ),
+        frappe._dict(
+            key="delivery_note",
+            doctype="Delivery Note",
+            party_field="customer",
+            date_field="posting_date",
+            columns={"total": "total", "grand_total": "grand_total", "qty": "total_qty"},
+            fields=["total_taxable_amount", "total_amount", "total_qty"],
+            detail=item_detail("Delivery Note Item"),
+        ),
+        frappe._dict(
+            key="sales_invoice",
+            doctype="Sales Invoice",
+            due_date_field="due_date",
+            party_field="customer",
+            date_field="posting_date",
+            columns={"total": "total", "grand_total": "grand_total", "qty": "total_qty", "outstanding": "outstanding_amount"},
+            fields=["total_taxable_amount", "total_amount", "total_qty", "paid_amount", "pending_amount"],
+            detail=item_detail("Sales Invoice Item"),
+        ),
+        payment_request_source(),
+        payment_entry_source(),
+    ],
+)
+
+PURCHASE_CYCLE = frappe._dict(
+    party_type="Supplier",
+    party_name_field="supplier_name",
+    group_field="supplier_group",
+    currency_field="default_currency",
+    contact_fields=["mobile_no", "email_id"],
+    sources=[
+        frappe._dict(
+            key="purchase_order",
+            doctype="Purchase Order",
+            party_field="supplier",
+            date_field="transaction_date",
+            columns={"total": "total", "grand_total": "grand_total", "qty": "total_qty"},
+            fields=["total_taxable_amount", "total_amount", "total_qty"],
+            detail=item_detail("Purchase Order Item", pending_qty_field="received_qty"),
+        ),
+        frappe._dict(
+            key="purchase_receipt",
+            doctype="Purchase Receipt",
+            party_field="supplier",
+            date_field="posting_date",
+            columns={"total": "total", "grand_total": "grand_total", "qty": "total_qty"},
+            fields=["total_taxable_amount", "total_amount", "total_qty"],
+            detail=item_detail("Purchase Receipt Item"),
+        ),
+        frappe._dict(
+            key="purchase_invoice",
+            doctype="Purchase Invoice",
+            due_date_field="due_date",
+            party_field="supplier",
+            date_field="posting_date",
+            columns={"total": "total", "grand_total": "grand_total", "qty": "total_qty", "outstanding": "outstanding_amount"},
+            fields=["total_taxable_amount", "total_amount", "total_qty", "paid_amount", "pending_amount"],
+            detail=item_detail("Purchase Invoice Item"),
+        ),
+        payment_request_source(),
+        payment_entry_source(),
+    ],
+)
+
+CYCLES = {
+    "Customer": SALES_CYCLE,
+    "Supplier": PURCHASE_CYCLE,
+}
+
+
+def get_cycle(party_type):
+    if party_type not in CYCLES:
+        frappe.throw(frappe._("Insights are not available for {0}").format(party_type))
+
+    return CYCLES[party_type]
+
+
+def get_source(cycle, doctype):
+    source = next((source for source in cycle.sources if source.doctype == doctype), None)
+    if not source:
+        frappe.throw(frappe._("{0} is not part of the {1} insights").format(doctype, cycle.party_type))
+
+    return source
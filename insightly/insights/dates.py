@@ -0,0 +1,21 @@
+from frappe.utils import add_days, getdate
+
+
+# Date Windows Shared By Every Insightly Query
+# A start / end date range is matched as the half-open window [start, end + 1 day) on the doctype's indexed
+# date column (the source's date_field, the rollup's posting_date), so the whole end day is included whether
+# the column holds dates or datetimes and the condition stays a plain index range scan.
+
+
+def get_date_window(start_date, end_date):
+    return getdate(start_date), add_days(getdate(end_date), 1)
+
+
+def get_window_values(start_date, end_date, prefix=""):
+    # A prefix names a second window (e.g. the comparison period) in the same query
+    from_date, to_date = get_date_window(start_date, end_date)
+    return {f"{prefix}from_date": from_date, f"{prefix}to_date": to_date}
+
+
+def get_window_conditions(column, prefix=""):
+    return f"{column} >= %({prefix}from_date)s AND {column} < %({prefix}to_date)s"
@@ -0,0 +1,139 @@
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint
+
+
+# Query Layer For Insightly's Read-Only Analytics
+# Every aggregate / drill-down query goes through sql() so it can be profiled (see profiling.py) and, with
+# "insightly_read_from_replica" in site_config.json, served by the read replica configured for the site
+# ("replica_host", "replica_db_port" and the optional replica credentials frappe itself reads).
+# The primary is used whenever the replica is unreachable or more than "insightly_max_replica_lag" seconds behind.
+# The lag is read from SHOW SLAVE STATUS, which needs the global REPLICATION CLIENT privilege (SLAVE MONITOR on
+# MariaDB 10.5+) for the site's database user; while it cannot be read the primary is used.
+
+REPLICA_STATUS_KEY = "insightly|replica_status"
+DEFAULT_MAX_REPLICA_LAG = 10
+
+# How long one lag check is trusted before the replica is checked again
+REPLICA_CHECK_INTERVAL = 10
+
+# How long the primary is used before retrying a replica whose lag could not be read
+REPLICA_UNMEASURED_INTERVAL = 5 * 60
+
+
+def sql(query, values=(), **kwargs):
+    connection = get_connection()
+    profile = getattr(frappe.local, "insightly_profile", None)
+    if not profile:
+        return connection.sql(query, values, **kwargs)
+
+    start = time.perf_counter()
+    result = connection.sql(query, values, **kwargs)
+    profile.queries.append({
+        "query": " ".join(query.split())[:300],
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+        "rows": len(result),
+    })
+
+    return result
+
+
+def sql_list(query, values=()):
+    return [row[0] for row in sql(query, values)]
+
+
+def get_connection():
+    # Replica When Routing Is Enabled And It Is Healthy, Else The Primary (frappe.db)
+    if not cint(frappe.conf.get("insightly_read_from_replica")) or getattr(frappe.local, "insightly_use_primary", False):
+        return frappe.db
+
+    replica = getattr(frappe.local, "insightly_replica_db", None)
+    if replica is None:
+        # False remembers a failed attempt for the rest of the request
+        replica = frappe.local.insightly_replica_db = connect_replica() or False
+
+    return replica or frappe.db
+
+
+def connect_replica():
+    cache = frappe.cache()
+    status = cache.get_value(REPLICA_STATUS_KEY)
+    if status and not status.get("available"):
+        return None
+
+    conf = frappe.conf
+    user, password = conf.db_user or conf.db_name, conf.db_password
+    if conf.different_credentials_for_replica:
+        user, password = conf.replica_db_user or conf.replica_db_name, conf.replica_db_password
+
+    replica, interval = None, REPLICA_CHECK_INTERVAL
+    try:
+        from frappe.database import get_db
+
+        replica = get_db(host=conf.replica_host, port=conf.replica_db_port, user=user, password=password,
+            cur_db_name=conf.db_name)
+        replica.connect()
+
+        if not status:
+            lag = get_replica_lag(replica)
+            max_lag = cint(conf.get("insightly_max_replica_lag", DEFAULT_MAX_REPLICA_LAG))
+            status = {"available": lag is not None and lag <= max_lag, "lag": lag}
+            if lag is None:
+                interval = REPLICA_UNMEASURED_INTERVAL
+            elif lag > max_lag:
+                frappe.logger("insightly").warning(f"Insightly replica lag {lag} exceeds {max_lag}s, using the primary")
+            # Only a fresh check is stored, so a healthy status still expires and gets rechecked
+            cache.set_value(REPLICA_STATUS_KEY, status, expires_in_sec=interval)
+    except Exception:
+        frappe.logger("insightly").exception("Insightly replica unreachable, using the primary")
+        status = {"available": False, "lag": None}
+        cache.set_value(REPLICA_STATUS_KEY, status, expires_in_sec=interval)
+
+    if replica and not status["available"]:
+        replica.close()
+
+    return replica if status["available"] else None
+
+
+def get_replica_lag(replica):
+    # Seconds_Behind_Master Of The Replica; None when it is not replicating or the status cannot be read
+    # An idle primary is no evidence the replica caught up, so an unknown lag keeps reads on the primary
+    try:
+        status = replica.sql("SHOW SLAVE STATUS", as_dict=True)
+    except Exception:
+        frappe.logger("insightly").warning(
+            "Insightly cannot read the replica's status (REPLICATION CLIENT / SLAVE MONITOR privilege), using the primary"
+        )
+        return None
+
+    if not status or status[0].get("Seconds_Behind_Master") is None:
+        frappe.logger("insightly").warning("Insightly replica is not replicating, using the primary")
+        return None
+
+    return cint(status[0].Seconds_Behind_Master)
+
+
+def escape_like(text):
+    # Matching Typed Text Literally In A LIKE Pattern (backslash is the default escape character)
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def close_replica(*args, **kwargs):
+    # After Request / After Job Hook
+    replica = getattr(frappe.local, "insightly_replica_db", None)
+    frappe.local.insightly_replica_db = None
+    if replica:
+        replica.close()
+
+
+@contextmanager
+def use_primary():
+    # Reads That Must See Writes Just Committed On The Primary
+    previous = getattr(frappe.local, "insightly_use_primary", False)
+    frappe.local.insightly_use_primary = True
+    try:
+        yield
+    finally:
+        frappe.local.insightly_use_primary = previous
@@ -0,0 +1,166 @@
+import bisect
+
+import frappe
+from frappe.core.doctype.user_permission.user_permission import get_user_permissions
+from frappe.desk.search import search_link
+from frappe.permissions import get_role_permissions
+from frappe.utils import cint
+
+from insightly.insights import db
+from insightly.insights.cache import DEFAULT_TTL, invalidate_party
+from insightly.insights.cycles import CYCLES
+
+DIRECTORY_KEY = "insightly|party_directory"
+VERSION_KEY = "insightly|party_directory_version"
+
+# Directories already loaded by this worker: (site, party_type) -> directory, reused while its version is current
+_directories = {}
+
+
+def get_party_directory(cycle):
+    # Every Party Of The Cycle With Its Name, Currency, Contact And Group Fields, Plus A Prefix Search Index
+    # Served from the worker's memory, else from Redis, else built with one query and shared through Redis.
+    # A party save sets a new version, so every worker reloads once after a change.
+    # Returns None while the insights cache is disabled (insightly_cache_ttl <= 0); callers then read the database
+    if cint(frappe.conf.get("insightly_cache_ttl", DEFAULT_TTL)) <= 0:
+        return None
+
+    cache = frappe.cache()
+    version = cache.hget(VERSION_KEY, cycle.party_type)
+    if not version:
+        version = frappe.generate_hash(length=10)
+        cache.hset(VERSION_KEY, cycle.party_type, version)
+
+    key = (frappe.local.site, cycle.party_type)
+    directory = _directories.get(key)
+    if directory and directory.version == version:
+        return directory
+
+    directory = cache.hget(DIRECTORY_KEY, cycle.party_type)
+    if not directory or directory.version != version:
+        # Stamped with the version read before the build, so a change committed meanwhile still forces a rebuild
+        directory = build_party_directory(cycle, version)
+        cache.hset(DIRECTORY_KEY, cycle.party_type, directory)
+
+    _directories[key] = directory
+    return directory
+
+
+def build_party_directory(cycle, version):
+    # Read from the primary: a lagging replica could stamp stale parties with the new version
+    fields = ["name", cycle.party_name_field, cycle.currency_field, *cycle.contact_fields, cycle.group_field, "disabled"]
+    parties = {
+        party.name: party
+        for party in frappe.db.sql(f"SELECT {', '.join(fields)} FROM `tab{cycle.party_type}`", as_dict=True)
+    }
+
+    # Prefix Index: every word suffix of the name and display name, sorted so a prefix is a contiguous range
+    entries = sorted(
+        (key, party.name)
+        for party in parties.values()
+        for text in {party.name, party.get(cycle.party_name_field)}
+        for key in get_search_keys(text)
+    )
+
+    return frappe._dict(
+        version=version,
+        parties=parties,
+        index_keys=[key for key, _ in entries],
+        index_names=[name for _, name in entries],
+    )
+
+
+def search_party_directory(cycle, txt, party_group=None, limit=20):
+    # Typeahead: Enabled Parties With A Word Of Their Name Or Display Name Starting With txt
+    # Returns link options ({"value", "description"}) like frappe.db.get_link_options
+    limit = min(cint(limit) or 20, 100)
+
+    # Users whose access is restricted get frappe's own link search, which applies their permissions
+    if not has_unrestricted_access(cycle.party_type):
+        filters = {cycle.group_field: party_group} if party_group else None
+        return search_link(cycle.party_type, txt or "", filters=filters, page_length=limit)
+
+    directory = get_party_directory(cycle)
+    if not directory:
+        return search_party_table(cycle, txt, party_group, limit)
+
+    prefix = normalize_search_text(txt)
+    results, seen = [], set()
+    for idx in range(bisect.bisect_left(directory.index_keys, prefix), len(directory.index_keys)):
+        if not directory.index_keys[idx].startswith(prefix) or len(results) >= limit:
+            break
+
+        party = directory.parties[directory.index_names[idx]]
+        if party.name in seen or party.disabled or (party_group and party.get(cycle.group_field) != party_group):
+            continue
+
+        seen.add(party.name)
+        results.append(get_link_option(cycle, party))
+
+    return results
+
+
+def search_party_table(cycle, txt, party_group, limit):
+    # Without The Directory: The Same Search As A LIKE Over The Party Table
+    group_condition = f"AND {cycle.group_field} = %(party_group)s" if party_group else ""
+    parties = frappe.db.sql(f"""
+        SELECT name, {cycle.party_name_field}
+        FROM `tab{cycle.party_type}`
+        WHERE disabled = 0 AND (name LIKE %(txt)s OR {cycle.party_name_field} LIKE %(txt)s) {group_condition}
+        ORDER BY name
+        LIMIT %(limit)s
+    """, {"txt": f"%{db.escape_like(txt or '')}%", "party_group": party_group, "limit": limit}, as_dict=True)
+
+    return [get_link_option(cycle, party) for party in parties]
+
+
+def has_unrestricted_access(party_type):
+    # Read Access To Every Party: a read permission that is not owner-only, no User Permissions (on the party or on
+    # a doctype it links to) and no permission query conditions
+    permissions = get_role_permissions(frappe.get_meta(party_type))
+    return bool(
+        permissions.get("read")
+        and not (permissions.get("if_owner") or {}).get("read")
+        and not get_user_permissions()
+        and not frappe.get_hooks("permission_query_conditions").get(party_type)
+    )
+
+
+def get_link_option(cycle, party):
+    party_name = party.get(cycle.party_name_field)
+    return {"value": party.name, "description": party_name if party_name != party.name else ""}
+
+
+def get_search_keys(text):
+    words = normalize_search_text(text).split()
+    return [" ".join(words[idx:]) for idx in range(len(words))]
+
+
+def normalize_search_text(text):
+    return " ".join((text or "").lower().split())
+
+
+def clear_party_directory(doc, method=None, old_name=None, *args):
+    # Doc Event: A New Directory Version (and dropping the party's cached insights) Once A Party Change Is Committed
+    # after_rename also passes the old name, whose cached results are dropped too
+    party_type = doc.doctype
+    parties = {doc.name, old_name} - {None}
+
+    def invalidate():
+        invalidate_party_directory(party_type)
+        for party in parties:
+            invalidate_party(party_type, party)
+
+    frappe.db.after_commit.add(invalidate)
+
+
+def invalidate_party_directory(party_type):
+    cache = frappe.cache()
+    cache.hset(VERSION_KEY, party_type, frappe.generate_hash(length=10))
+    cache.hdel(DIRECTORY_KEY, party_type)
+
+
+def clear_party_directories():
+    # After Migrate: Party fields may have been changed without a save
+    for party_type in CYCLES:
+        invalidate_party_directory(party_type)
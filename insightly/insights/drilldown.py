@@ -0,0 +1,216 @@
+import frappe
+from frappe.utils import cint
+
+from insightly.insights import db
+from insightly.insights.cache import get_cached_result
+from insightly.insights.cycles import get_source
+from insightly.insights.dates import get_window_conditions, get_window_values
+from insightly.insights.party_insights import get_date_range
+
+MAX_BATCH_PARTIES = 200
+DETAIL_PAGE_LENGTH = 100
+MAX_DETAIL_PAGE_LENGTH = 1000
+
+
+def get_party_details(cycle, party, doctype, details, filters=None, start=0, page_length=DETAIL_PAGE_LENGTH,
+        sort_by=None, search=None):
+    # Shared Implementation Of get_customer_details / get_supplier_details
+    # Returns one page of structured rows plus SQL computed totals, rendered by insightly.VirtualTable on the client
+    filters = frappe.parse_json(filters) or frappe._dict()
+    details = frappe.parse_json(details) or {}
+    start_date, end_date = get_date_range(filters)
+    start = max(cint(start), 0)
+    page_length = min(cint(page_length) or DETAIL_PAGE_LENGTH, MAX_DETAIL_PAGE_LENGTH)
+    search = (search or "").strip()
+
+    # Serve repeated drill-downs from the insights cache, tagged with the party
+    result = get_cached_result(
+        "get_party_details", cycle.party_type,
+        {
+            "party": party, "doctype": doctype, "start_date": start_date, "end_date": end_date,
+            "start": start, "page_length": page_length, "sort_by": sort_by, "search": search,
+        },
+        [party],
+        lambda: get_detail_data(cycle, doctype, party, start_date, end_date, start, page_length, sort_by, search),
+    )
+    result["total_records"] = details.get("total_records")
+
+    return result
+
+
+def get_detail_data(cycle, doctype, party, start_date, end_date, start=0, page_length=None, sort_by=None, search=None):
+    # Fetching Doctype Details Of One Party As {"columns", "rows", "totals", "total_rows"}
+    # Totals and total_rows cover every row matching the search, not just the returned page
+    rows = get_detail_rows(cycle, doctype, [party], start_date, end_date, sort_by, search, start, page_length)
+    totals = get_detail_totals(cycle, doctype, [party], start_date, end_date, search).get(party) or {}
+
+    return {
+        "party": party,
+        "doctype": doctype,
+        "columns": get_detail_columns(cycle, doctype),
+        "rows": [row[1:] for row in rows],
+        "totals": totals,
+        "total_rows": totals.pop("total_rows", 0),
+        "start": start,
+        "sort_by": sort_by,
+        "search": search,
+    }
+
+
+def get_detail_query(cycle, doctype, search=None):
+    # Shared FROM / WHERE Clause Of The Drill-Down Row And Total Queries
+    source = get_source(cycle, doctype)
+    detail = source.detail
+
+    # Same indexed date column and window as the rollup, so the drill-down counts match the insights row
+    conditions = [
+        "d.docstatus = 1",
+        f"d.{source.party_field} IN %(parties)s",
+        get_window_conditions(f"d.{source.date_field}"),
+    ]
+    if source.get("party_type_field"):
+        conditions.append(f"d.{source.party_type_field} = %(party_type)s")
+    if search and detail.get("search_fields"):
+        conditions.append(f"({' OR '.join(f'{field} LIKE %(search)s' for field in detail.search_fields)})")
+
+    tables = f"`tab{source.doctype}` d"
+    if detail.get("child_doctype"):
+        tables = f"`tab{detail.child_doctype}` c JOIN `tab{source.doctype}` d ON c.parent = d.name"
+
+    return f"FROM {tables} WHERE {' AND '.join(conditions)}"
+
+
+def get_detail_rows(cycle, doctype, parties, start_date, end_date, sort_by=None, search=None, start=0,
+        page_length=None):
+    # Fetching The Drill-Down Rows Of One Doctype For Any Number Of Parties In One Grouped Query
+    # Rows are tuples of (party, *detail columns); with page_length each party gets its own page
+    source = get_source(cycle, doctype)
+    detail = source.detail
+    fieldnames = [column.fieldname for column in detail.columns]
+
+    # The group (or document name) is the tie-breaker that keeps paging stable
+    row_key = detail.get("group_by") or "d.name"
+    query = f"""
+        SELECT d.{source.party_field} AS party, {", ".join(f"{column.expression} AS {column.fieldname}" for column in detail.columns)},
+            {row_key} AS row_key
+        {get_detail_query(cycle, doctype, search)}
+        {f"GROUP BY d.{source.party_field}, {detail.group_by}" if detail.get("group_by") else ""}
+    """
+    order_by = f"{parse_detail_sort(detail, sort_by)}, row_key"
+    values = get_detail_values(cycle, parties, start_date, end_date, search)
+    values.update({"start": cint(start), "page_length": cint(page_length)})
+
+    if not page_length:
+        paged_query = f"SELECT * FROM ({query}) detail ORDER BY party, {order_by}"
+    elif len(parties) == 1:
+        paged_query = f"SELECT * FROM ({query}) detail ORDER BY {order_by} LIMIT %(page_length)s OFFSET %(start)s"
+    else:
+        # Number the rows of every party to cut the same page out of each in one query
+        paged_query = f"""
+            SELECT * FROM (
+                SELECT detail.*, ROW_NUMBER() OVER (PARTITION BY party ORDER BY {order_by}) AS row_no
+                FROM ({query}) detail
+            ) numbered
+            WHERE row_no > %(start)s AND row_no <= %(start)s + %(page_length)s
+            ORDER BY party, row_no
+        """
+
+    return [
+        (row.party, *(row[fieldname] for fieldname in fieldnames))
+        for row in db.sql(paged_query, values, as_dict=True)
+    ]
+
+
+def get_detail_totals(cycle, doctype, parties, start_date, end_date, search=None):
+    # Footer Totals And Row Counts Per Party, Aggregated By The Database Instead Of Summed Row By Row
+    source = get_source(cycle, doctype)
+    detail = source.detail
+
+    # Grouped drill-downs already aggregate with SUM(), which stays valid without the item grouping
+    expressions = [
+        f"{column.expression if detail.get('group_by') else f'SUM({column.expression})'} AS {column.fieldname}"
+        for column in detail.columns
+        if column.get("total")
+    ]
+    expressions.append(f"COUNT(DISTINCT {detail.group_by}) AS total_rows" if detail.get("group_by") else "COUNT(*) AS total_rows")
+
+    result = db.sql(f"""
+        SELECT d.{source.party_field} AS party, {", ".join(expressions)}
+        {get_detail_query(cycle, doctype, search)}
+        GROUP BY d.{source.party_field}
+    """, get_detail_values(cycle, parties, start_date, end_date, search), as_dict=True)
+
+    return {row.pop("party"): row for row in result}
+
+
+def get_detail_values(cycle, parties, start_date, end_date, search=None):
+    return {
+        "party_type": cycle.party_type,
+        "parties": tuple(parties),
+        "search": f"%{db.escape_like(search)}%" if search else None,
+        **get_window_values(start_date, end_date),
+    }
+
+
+def parse_detail_sort(detail, sort_by=None):
+    # Validating "<fieldname> [asc|desc]" Against The Drill-Down Columns
+    parts = (sort_by or detail.get("sort_by") or detail.columns[0].fieldname).split()
+    sort_order = parts[1].upper() if len(parts) > 1 else "ASC"
+
+    if sort_order not in ("ASC", "DESC"):
+        frappe.throw(frappe._("Invalid sort order {0}").format(parts[1]))
+    if parts[0] not in [column.fieldname for column in detail.columns]:
+        frappe.throw(frappe._("Cannot sort details by {0}").format(parts[0]))
+
+    return f"{parts[0]} {sort_order}"
+
+
+def get_party_details_batch(cycle, parties, doctypes, filters=None):
+    # Shared Implementation Of get_customer_details_batch / get_supplier_details_batch
+    # Two grouped queries per doctype for all parties, returning the first page of every drill-down as
+    # {"columns": {doctype: [column, ...]}, "data": {party: {doctype: {"rows", "totals", "total_rows"}}}}
+    parties = frappe.parse_json(parties) or []
+    doctypes = frappe.parse_json(doctypes) or [source.doctype for source in cycle.sources]
+    filters = frappe.parse_json(filters) or frappe._dict()
+    start_date, end_date = get_date_range(filters)
+
+    if len(parties) > MAX_BATCH_PARTIES:
+        frappe.throw(frappe._("Drill-downs can be fetched for at most {0} parties at once").format(MAX_BATCH_PARTIES))
+
+    return get_cached_result(
+        "get_party_details_batch", cycle.party_type,
+        {"parties": parties, "doctypes": doctypes, "start_date": start_date, "end_date": end_date},
+        parties,
+        lambda: build_party_details_batch(cycle, parties, doctypes, start_date, end_date),
+    )
+
+
+def build_party_details_batch(cycle, parties, doctypes, start_date, end_date):
+    result = {"columns": {}, "data": {party: {} for party in parties}}
+    if not parties:
+        return result
+
+    for doctype in doctypes:
+        result["columns"][doctype] = get_detail_columns(cycle, doctype)
+        totals = get_detail_totals(cycle, doctype, parties, start_date, end_date)
+        for party in parties:
+            party_totals = totals.get(party) or {}
+            result["data"][party][doctype] = {
+                "rows": [],
+                "total_rows": party_totals.pop("total_rows", 0),
+                "totals": party_totals,
+            }
+
+        rows = get_detail_rows(cycle, doctype, parties, start_date, end_date, page_length=DETAIL_PAGE_LENGTH)
+        for row in rows:
+            result["data"][row[0]][doctype]["rows"].append(row[1:])
+
+    return result
+
+
+def get_detail_columns(cycle, doctype):
+    # Column Metadata The Client Needs To Render A Drill-Down
+    return [
+        {key: column.get(key) for key in ("fieldname", "label", "fieldtype", "width", "total")}
+        for column in get_source(cycle, doctype).detail.columns
+    ]
@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+
+import frappe
+from frappe.utils import cint, flt
+from werkzeug.wrappers import Response
+
+from insightly.insights import db
+from insightly.insights.aggregation import ROLLUP_FIELDS, get_query_values, get_rollup_conditions
+from insightly.insights.party_insights import get_date_range
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows are written out in chunks so the response is neither flushed per row nor buffered whole
+CHUNK_SIZE = 500
+
+
+def stream_party_insights(cycle, filters, file_format="csv"):
+    # Streaming The Full Insights Matrix Of A Cycle As CSV Or NDJSON
+    # One row per party, read through an unbuffered server-side cursor so memory stays flat
+    # Every party is exported, so the permission is checked before the stream starts
+    frappe.has_permission(cycle.party_type, "read", throw=True)
+    filters = frappe.parse_json(filters)
+    if file_format not in EXPORT_FORMATS:
+        frappe.throw(frappe._("Unsupported export format {0}").format(file_format))
+
+    start_date, end_date = get_date_range(filters)
+    query, values = get_export_query(cycle, filters, start_date, end_date)
+    columns = get_export_columns(cycle)
+    write_rows = write_csv if file_format == "csv" else write_ndjson
+
+    site, user = frappe.local.site, frappe.session.user
+
+    def generate():
+        # The request context is destroyed before the body is sent, so the stream connects on its own
+        frappe.init(site=site)
+        frappe.connect()
+        frappe.set_user(user)
+
+        try:
+            if file_format == "csv":
+                yield write_csv(cycle, columns, [], header=True)
+
+            connection = db.get_connection()
+            with connection.unbuffered_cursor():
+                chunk = []
+                for row in connection.sql(query, values, as_iterator=True):
+                    chunk.append(row)
+                    if len(chunk) >= CHUNK_SIZE:
+                        yield write_rows(cycle, columns, chunk)
+                        chunk = []
+
+                if chunk:
+                    yield write_rows(cycle, columns, chunk)
+        finally:
+            db.close_replica()
+            frappe.destroy()
+
+    filename = f"{frappe.scrub(cycle.party_type)}_insights_{start_date}_{end_date}.{file_format}"
+    response = Response(generate(), mimetype=EXPORT_FORMATS[file_format], direct_passthrough=True)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["X-Accel-Buffering"] = "no"
+
+    return response
+
+
+def get_export_query(cycle, filters, start_date, end_date):
+    # One Row Per Party With Every Doctype's Aggregates Pivoted Into Columns
+    values = get_query_values(cycle, start_date, end_date, filters.get("party"))
+    values["party_group"] = filters.get("party_group")
+    values["default_currency"] = frappe.db.get_default("currency")
+
+    pivots = []
+    for idx, source in enumerate(cycle.sources):
+        values[f"doctype_{idx}"] = source.doctype
+        for field in ["total_records", *source.fields]:
+            pivots.append(
+                f"SUM(CASE WHEN r.reference_doctype = %(doctype_{idx})s THEN r.{ROLLUP_FIELDS[field]} ELSE 0 END)"
+            )
+
+    # Parties without a currency of their own fall back to the default currency, as in the grid
+    party_fields = ", ".join([
+        *[f"p.{field}" for field in [cycle.party_name_field, *cycle.contact_fields]],
+        f"COALESCE(NULLIF(p.{cycle.currency_field}, ''), %(default_currency)s)",
+    ])
+    group_condition = f"p.{cycle.group_field} = %(party_group)s" if filters.get("party_group") else "1 = 1"
+
+    query = f"""
+        SELECT r.party, {party_fields}, {", ".join(pivots)}
+        FROM `tabInsightly Party Rollup` r
+        INNER JOIN `tab{cycle.party_type}` p ON p.name = r.party
+        WHERE {get_rollup_conditions(filters.get("party"), "r")} AND {group_condition}
+        GROUP BY r.party
+        HAVING SUM(r.record_count) > 0
+        ORDER BY r.party
+    """
+
+    return query, values
+
+
+def get_export_columns(cycle):
+    # (source key or None, fieldname, label) in the order of the export query
+    columns = [(None, "party", cycle.party_type), (None, "party_name", f"{cycle.party_type} Name")]
+    columns += [(None, field, frappe.unscrub(field)) for field in cycle.contact_fields]
+    columns.append((None, "currency", "Currency"))
+    for source in cycle.sources:
+        columns += [
+            (source.key, field, f"{source.doctype} {frappe.unscrub(field)}")
+            for field in ["total_records", *source.fields]
+        ]
+
+    return columns
+
+
+def write_csv(cycle, columns, rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow([label for _, _, label in columns])
+    writer.writerows(rows)
+
+    return buffer.getvalue()
+
+
+def write_ndjson(cycle, columns, rows):
+    lines = []
+    for row in rows:
+        record = {}
+        for (source_key, fieldname, _), value in zip(columns, row):
+            if source_key:
+                record.setdefault(source_key, {})[fieldname] = cint(value) if fieldname == "total_records" else flt(value)
+            else:
+                record[fieldname] = value
+        lines.append(json.dumps(record, default=str))
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,59 @@
+import frappe
+
+from insightly.insights.cycles import CYCLES
+from insightly.insights.rollup import ROLLUP_COLUMNS, ROLLUP_DOCTYPE
+
+INDEX_NAME = "insightly_party_date"
+
+
+def get_insights_indexes():
+    # Covering Composite Indexes For The Party / Docstatus / Date Range Queries
+    # Equality columns first, then the range column, then the summed columns so the rollup never reads rows
+    indexes = {}
+    for cycle in CYCLES.values():
+        for source in cycle.sources:
+            fields = [source.get("party_type_field"), source.party_field, "docstatus", source.date_field]
+            fields += [column for column in source.columns.values() if column not in fields]
+            # The invoice index also covers the ageing query
+            if source.get("due_date_field"):
+                fields.append(source.due_date_field)
+            indexes[source.doctype] = [field for field in fields if field]
+
+    indexes[ROLLUP_DOCTYPE] = ["party_type", "reference_doctype", "posting_date", "party", *ROLLUP_COLUMNS]
+
+    return indexes
+
+
+def add_insights_indexes():
+    for doctype, fields in get_insights_indexes().items():
+        if not frappe.db.table_exists(doctype):
+            continue
+
+        if get_index_columns(doctype) not in ([], fields):
+            # Index definition changed, rebuild it with the current columns
+            frappe.db.sql_ddl(f"ALTER TABLE `tab{doctype}` DROP INDEX `{INDEX_NAME}`")
+
+        frappe.db.add_index(doctype, fields, INDEX_NAME)
+
+
+def check_insights_indexes():
+    # After Migrate: Making Sure Every Covering Index Exists And Matches Its Definition
+    missing = [
+        doctype
+        for doctype, fields in get_insights_indexes().items()
+        if frappe.db.table_exists(doctype) and get_index_columns(doctype) != fields
+    ]
+
+    if missing:
+        frappe.logger("insightly").warning(f"Insightly indexes missing or outdated on {', '.join(missing)}, recreating")
+        add_insights_indexes()
+
+
+def get_index_columns(doctype):
+    return [
+        row.Column_name
+        for row in sorted(
+            frappe.db.sql(f"SHOW INDEX FROM `tab{doctype}` WHERE Key_name = %s", INDEX_NAME, as_dict=True),
+            key=lambda row: row.Seq_in_index,
+        )
+    ]
@@ -0,0 +1,79 @@
+import frappe
+from frappe.utils import cint
+from frappe.utils.background_jobs import is_job_enqueued
+
+JOB_PREFIX = "insightly|job"
+PROGRESS_EVENT = "insightly_insights_progress"
+
+DEFAULT_RESULT_TTL = 600
+
+
+def enqueue_insights_job(job_key, method, **kwargs):
+    # Running A Heavy Insights Request On The Long Queue
+    # Identical requests share one job; every requesting user is subscribed to its progress
+    # job_key is the request's insights cache key: a result still cached there is returned right away, and it is
+    # dropped with the parties' other cached results on submit / cancel (the result key only hands it to the pages)
+    cache = frappe.cache()
+    result = cache.get_value(job_key)
+    if result is not None:
+        return {"status": "finished", "job_key": job_key, "result": result}
+
+    users_key = get_users_key(job_key)
+    cache.sadd(users_key, frappe.session.user)
+    cache.expire(cache.make_key(users_key), get_result_ttl())
+
+    job_id = f"insightly::{job_key}"
+    if not is_job_enqueued(job_id):
+        frappe.enqueue(
+            method,
+            queue="long",
+            job_id=job_id,
+            deduplicate=True,
+            job_key=job_key,
+            **kwargs,
+        )
+
+    return {"status": "queued", "job_key": job_key}
+
+
+def publish_job_progress(job_key, percent, description=None, status="running"):
+    message = {"job_key": job_key, "status": status, "percent": percent, "description": description}
+    for user in get_job_users(job_key):
+        frappe.publish_realtime(PROGRESS_EVENT, message, user=user, after_commit=False)
+
+
+def finish_job(job_key, result):
+    # Storing The Result For The Pages To Pick Up, Then Notifying The Subscribed Users
+    frappe.cache().set_value(get_result_key(job_key), result, expires_in_sec=get_result_ttl())
+    publish_job_progress(job_key, 100, status="finished")
+
+
+def fail_job(job_key):
+    frappe.log_error(title="Insightly insights job failed")
+    publish_job_progress(job_key, 100, status="failed")
+    frappe.cache().delete_value(get_users_key(job_key))
+
+
+@frappe.whitelist()
+def get_insights_job_result(job_key):
+    # Only users who requested the computation may collect its result
+    if frappe.session.user not in get_job_users(job_key):
+        frappe.throw(frappe._("Not permitted"), frappe.PermissionError)
+
+    return frappe.cache().get_value(get_result_key(job_key))
+
+
+def get_job_users(job_key):
+    return {frappe.safe_decode(user) for user in frappe.cache().smembers(get_users_key(job_key))}
+
+
+def get_result_ttl():
+    return cint(frappe.conf.get("insightly_job_result_ttl", DEFAULT_RESULT_TTL))
+
+
+def get_result_key(job_key):
+    return f"{JOB_PREFIX}|result|{job_key}"
+
+
+def get_users_key(job_key):
+    return f"{JOB_PREFIX}|users|{job_key}"
@@ -0,0 +1,108 @@
+import hashlib
+import json
+
+import frappe
+
+from insightly.insights import db
+from insightly.insights.aggregation import get_party_aggregates
+from insightly.insights.cycles import get_cycle
+from insightly.insights.party_insights import get_comparison_range, get_date_range, get_insights_columns, get_insights_row, get_party_details_map
+from insightly.insights.rollup import get_affected_parties
+
+LIVE_PREFIX = "insightly|live"
+LIVE_EVENT = "insightly_party_update"
+
+# Pages renew their subscription on every fetch and refresh, so abandoned ones lapse on their own
+SUBSCRIPTION_TTL = 5 * 60
+
+
+@frappe.whitelist()
+def subscribe_live_insights(party_type, filters):
+    # Opt-In Live Mode: Registering The Page's Resolved Date Range For Pushed Row Updates
+    get_cycle(party_type)
+    filters = frappe.parse_json(filters)
+    start_date, end_date = get_date_range(filters)
+
+    subscription = {
+        "user": frappe.session.user,
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+        "previous_dates": get_comparison_range(filters, start_date, end_date),
+    }
+    key = get_subscription_key(party_type, subscription)
+
+    cache = frappe.cache()
+    cache.set_value(key, subscription, expires_in_sec=SUBSCRIPTION_TTL)
+    cache.sadd(get_index_key(party_type), key)
+
+    return {"subscription": key, "start_date": start_date, "end_date": end_date}
+
+
+def publish_party_updates(doc, method=None):
+    # Doc Event: Pushing The Recomputed Rows Of The Document's Parties Once The Change Is Committed
+    parties = get_affected_parties(doc)
+
+    def publish():
+        # A replica may not have the commit yet
+        with db.use_primary():
+            for party_type, party in parties:
+                publish_party_update(party_type, party)
+
+    frappe.db.after_commit.add(publish)
+
+
+def publish_party_update(party_type, party):
+    subscriptions = get_subscriptions(party_type)
+    if not subscriptions:
+        return
+
+    cycle = get_cycle(party_type)
+    details = get_party_details_map(cycle, [party]).get(party)
+    if not details:
+        return
+
+    # One aggregate per distinct date range (and comparison period), shared by every page watching it
+    default_currency = frappe.db.get_default("currency")
+    rows = {}
+    for key, subscription in subscriptions.items():
+        previous_dates = subscription.get("previous_dates")
+        date_range = (subscription["start_date"], subscription["end_date"], *(previous_dates or ()))
+        if date_range not in rows:
+            aggregates = get_party_aggregates(cycle, subscription["start_date"], subscription["end_date"],
+                parties=[party], previous_dates=previous_dates)
+            rows[date_range] = get_insights_row(cycle, details, aggregates.get(party) or {}, default_currency,
+                bool(previous_dates))
+
+        message = {
+            "party_type": party_type,
+            "subscription": key,
+            "columns": get_insights_columns(cycle, bool(previous_dates)),
+            "row": rows[date_range],
+        }
+        frappe.publish_realtime(LIVE_EVENT, message, user=subscription["user"], after_commit=False)
+
+
+def get_subscriptions(party_type):
+    # Live Subscriptions Of A Party Type, Pruning The Ones That Expired
+    cache = frappe.cache()
+    index_key = get_index_key(party_type)
+
+    subscriptions = {}
+    for key in cache.smembers(index_key):
+        key = frappe.safe_decode(key)
+        subscription = cache.get_value(key)
+        if subscription is None:
+            cache.srem(index_key, key)
+        else:
+            subscriptions[key] = subscription
+
+    return subscriptions
+
+
+def get_subscription_key(party_type, subscription):
+    digest = hashlib.sha1(json.dumps(subscription, sort_keys=True).encode()).hexdigest()
+    return f"{LIVE_PREFIX}|{party_type}|{digest}"
+
+
+def get_index_key(party_type):
+    return f"{LIVE_PREFIX}|index|{party_type}"
@@ -0,0 +1,275 @@
+import frappe
+from frappe.utils import add_days, add_years, cint, date_diff, flt, get_datetime, getdate, nowdate
+
+from insightly.insights import db
+from insightly.insights.aggregation import get_changed_parties, get_party_aggregates, get_ranked_parties, get_rollup_watermark
+from insightly.insights.cache import get_cache_key, get_cached_result
+from insightly.insights.cycles import get_cycle
+from insightly.insights.directory import get_party_directory
+from insightly.insights.jobs import enqueue_insights_job, fail_job, finish_job, publish_job_progress
+from insightly.insights.supersede import RequestSuperseded, start_request
+
+# Date Range Presets (days back from today)
+DATE_RANGES = {
+    "Last Week": -7,
+    "Last Month": -30,
+    "Last 3 Months": -90,
+    "Last Year": -365,
+}
+
+
+# Comparison Periods: the same number of days right before the range, or the same dates a year earlier
+COMPARE_MODES = ("Previous Period", "Previous Year")
+
+# Low-cardinality columns sent as dictionary codes in the columnar format
+COLUMNAR_DICTIONARY_FIELDS = ("currency",)
+
+# Above this many changed parties a delta refresh asks the page to reload instead
+MAX_DELTA_PARTIES = 500
+
+
+def get_party_insights(cycle, filters, page=1, page_length=20, order_by=None, top_n=None, run_async=False,
+        response_format="rows", since=None, request_id=None):
+    # Shared Implementation Of get_customer_insights / get_supplier_insights
+    # response_format "rows" returns a column schema with row tuples, "columnar" one array per column
+    # With a `since` watermark only the rows of parties changed after it are returned
+    # A request_id lets a newer request of the same page abandon this one between stages
+    # A "compare" filter adds the previous period's aggregates and the deltas to every row
+    args = get_insights_args(filters, page, page_length, order_by, top_n)
+
+    if since:
+        return get_insights_delta(cycle, args, since)
+
+    # Heavy requests can run on the long queue; the page is notified through realtime progress events
+    if cint(run_async):
+        return enqueue_insights_job(
+            get_cache_key("get_party_insights", cycle.party_type, args),
+            "insightly.insights.party_insights.run_party_insights_job",
+            party_type=cycle.party_type,
+            args=args,
+        )
+
+    try:
+        check_superseded = start_request(request_id)
+        result = get_cached_insights(cycle, args, progress=lambda percent, description: check_superseded())
+    except RequestSuperseded:
+        return {"superseded": 1, "request_id": request_id}
+
+    return to_columnar(result) if response_format == "columnar" else result
+
+
+def get_insights_args(filters, page=1, page_length=20, order_by=None, top_n=None):
+    filters = frappe.parse_json(filters)
+    start_date, end_date = get_date_range(filters)
+
+    return frappe._dict(
+        filters=filters,
+        start_date=start_date,
+        end_date=end_date,
+        previous_dates=get_comparison_range(filters, start_date, end_date),
+        page=max(cint(page), 1),
+        page_length=min(cint(page_length) or 20, 500),
+        order_by=order_by,
+        top_n=cint(top_n),
+    )
+
+
+def get_cached_insights(cycle, args, progress=None):
+    # Serve repeated requests from the insights cache, tagged with the selected parties
+    return get_cached_result(
+        "get_party_insights", cycle.party_type, args, args.filters.get("party"),
+        lambda: build_party_insights(cycle, args, progress),
+    )
+
+
+def run_party_insights_job(job_key, party_type, args):
+    # Background Job: Computing One Insights Request And Publishing Its Progress
+    cycle = get_cycle(party_type)
+    args = frappe._dict(args)
+
+    try:
+        result = get_cached_insights(cycle, args, progress=lambda percent, description: publish_job_progress(job_key, percent, description))
+    except Exception:
+        fail_job(job_key)
+        raise
+
+    finish_job(job_key, result)
+
+
+def build_party_insights(cycle, args, progress=None):
+    progress = progress or (lambda percent, description: None)
+    filters = args.filters
+
+    # Read before aggregating, so changes made while building are picked up by the next delta
+    watermark = get_rollup_watermark(cycle)
+
+    # Rank parties in SQL and aggregate only the requested page of them
+    progress(10, "Ranking parties")
+    ranked = get_ranked_parties(cycle, args.start_date, args.end_date,
+        parties=filters.get("party"), party_group=filters.get("party_group"), order_by=args.order_by,
+        start=(args.page - 1) * args.page_length, page_length=args.page_length, top_n=args.top_n,
+        previous_dates=args.previous_dates)
+
+    progress(50, "Aggregating transactions")
+    aggregates = get_party_aggregates(cycle, args.start_date, args.end_date, parties=ranked.parties,
+        previous_dates=args.previous_dates)
+    parties = get_party_details_map(cycle, ranked.parties)
+
+    progress(90, "Preparing results")
+    default_currency = frappe.db.get_default("currency")
+    compare = bool(args.previous_dates)
+    rows = [
+        get_insights_row(cycle, parties[party], aggregates[party], default_currency, compare)
+        for party in ranked.parties
+        if party in parties and party in aggregates
+    ]
+
+    return {
+        "total": ranked.total,
+        "page": args.page,
+        "page_length": args.page_length,
+        "columns": get_insights_columns(cycle, compare),
+        "rows": rows,
+        "watermark": watermark,
+        "previous_dates": args.previous_dates,
+    }
+
+
+def get_insights_delta(cycle, args, since):
+    # Delta Refresh: Rows Of The Parties Whose Rollup Changed Since The Watermark
+    # Not cached, it only touches the changed parties and moves the watermark forward
+    compare = bool(args.previous_dates)
+    watermark = get_rollup_watermark(cycle)
+    if not watermark or get_datetime(watermark) <= get_datetime(since):
+        return {"delta": 1, "watermark": since, "columns": get_insights_columns(cycle, compare), "rows": []}
+
+    filters = args.filters
+    changed = get_changed_parties(cycle, args.start_date, args.end_date, since,
+        parties=filters.get("party"), party_group=filters.get("party_group"), limit=MAX_DELTA_PARTIES + 1,
+        previous_dates=args.previous_dates)
+    if len(changed) > MAX_DELTA_PARTIES:
+        return {"delta": 1, "full_refresh": 1, "watermark": watermark}
+
+    aggregates = get_party_aggregates(cycle, args.start_date, args.end_date, parties=changed,
+        previous_dates=args.previous_dates)
+    parties = get_party_details_map(cycle, changed)
+    default_currency = frappe.db.get_default("currency")
+
+    return {
+        "delta": 1,
+        "watermark": watermark,
+        "columns": get_insights_columns(cycle, compare),
+        "rows": [
+            get_insights_row(cycle, parties[party], aggregates.get(party) or {}, default_currency, compare)
+            for party in changed
+            if party in parties
+        ],
+    }
+
+
+def get_insights_columns(cycle, compare=False):
+    # Column Schema Of The Insights Rows: party fields, currency, then each doctype's raw aggregates
+    # (followed by their previous period values and deltas when comparing)
+    columns = ["party", "party_name", *cycle.contact_fields, "currency"]
+    for source in cycle.sources:
+        columns += [f"{source.key}.{field}" for field in get_source_fields(source, compare)]
+
+    return columns
+
+
+def get_insights_row(cycle, party, aggregates, default_currency=None, compare=False):
+    # One Row Tuple Matching get_insights_columns; amounts stay numeric and are formatted on the client
+    row = [
+        party.name,
+        party.get(cycle.party_name_field),
+        *[party.get(field) for field in cycle.contact_fields],
+        party.get(cycle.currency_field) or default_currency,
+    ]
+    for source in cycle.sources:
+        data = aggregates.get(source.key) or {}
+        for field in get_source_fields(source, compare):
+            # Record counts (and their previous values and deltas) are integers
+            row.append(cint(data.get(field)) if "total_records" in field else flt(data.get(field)))
+
+    return row
+
+
+def get_source_fields(source, compare=False):
+    fields = ["total_records", *source.fields]
+    if compare:
+        fields += [f"previous_{field}" for field in fields] + [f"{field}_delta" for field in fields]
+
+    return fields
+
+
+def to_columnar(result):
+    # Columnar Response: one array per column, low-cardinality strings dictionary-encoded
+    # {"format": "columnar", "length": n, "columns": {column: [...]}, "dictionaries": {column: [values]}}
+    names = result["columns"]
+    values = [list(column) for column in zip(*result["rows"])] if result["rows"] else [[] for _ in names]
+    columns = dict(zip(names, values))
+
+    dictionaries = {}
+    for fieldname in COLUMNAR_DICTIONARY_FIELDS:
+        dictionary = sorted({value for value in columns[fieldname] if value is not None})
+        codes = {value: idx for idx, value in enumerate(dictionary)}
+        columns[fieldname] = [codes.get(value, -1) for value in columns[fieldname]]
+        dictionaries[fieldname] = dictionary
+
+    return {
+        "format": "columnar",
+        "total": result["total"],
+        "page": result["page"],
+        "page_length": result["page_length"],
+        "length": len(result["rows"]),
+        "columns": columns,
+        "dictionaries": dictionaries,
+        "watermark": result.get("watermark"),
+        "previous_dates": result.get("previous_dates"),
+    }
+
+
+def get_party_details_map(cycle, parties):
+    if not parties:
+        return {}
+
+    directory = get_party_directory(cycle)
+    if directory:
+        return {party: directory.parties[party] for party in parties if party in directory.parties}
+
+    fields = ["name", cycle.party_name_field, cycle.currency_field, *cycle.contact_fields]
+    return {
+        party.name: party
+        for party in db.sql(f"""
+            SELECT {", ".join(fields)}
+            FROM `tab{cycle.party_type}`
+            WHERE name IN %(parties)s
+        """, {"parties": tuple(parties)}, as_dict=True)
+    }
+
+
+def get_date_range(filters):
+    # Date Range Logic, defaults to Last Month if the preset is unknown
+    if filters.get("date_range") == "Select Date Range":
+        start_date, end_date = filters.get("selected_date_range")
+    else:
+        start_date = add_days(nowdate(), DATE_RANGES.get(filters.get("date_range"), -30))
+        end_date = nowdate()
+
+    return start_date, end_date
+
+
+def get_comparison_range(filters, start_date, end_date):
+    # Previous Period Of The Same Length, Or The Same Dates A Year Earlier; None Without A "compare" Filter
+    compare = filters.get("compare")
+    if not compare:
+        return None
+    if compare not in COMPARE_MODES:
+        frappe.throw(frappe._("Invalid comparison {0}").format(compare))
+
+    start_date, end_date = getdate(start_date), getdate(end_date)
+    if compare == "Previous Year":
+        return [str(add_years(start_date, -1)), str(add_years(end_date, -1))]
+
+    days = date_diff(end_date, start_date) + 1
+    return [str(add_days(start_date, -days)), str(add_days(start_date, -1))]
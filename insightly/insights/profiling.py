@@ -0,0 +1,132 @@
+import functools
+import json
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+from insightly.insights import db
+
+PROFILE_SAMPLES_KEY = "insightly|profile_samples"
+MAX_SAMPLES = 500
+
+DEFAULT_SLOW_REQUEST_MS = 2000
+
+# Slowest queries kept per sample
+MAX_SAMPLE_QUERIES = 10
+
+
+# Request Profiling For The Insights And Drill-Down Endpoints
+# Enabled with "insightly_profiling" in site_config.json; "insightly_timing_header" adds an X-Insightly-Timing
+# header to profiled responses and requests slower than "insightly_slow_request_ms" are logged.
+
+
+def profiled(endpoint):
+    # Decorator Recording SQL Time, Query Count, Rows Read, Python Time And Payload Size Of An Endpoint
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Nested endpoints (a get_*_data helper called by another one) count towards the outer profile
+            if not cint(frappe.conf.get("insightly_profiling")) or getattr(frappe.local, "insightly_profile", None):
+                return fn(*args, **kwargs)
+
+            profile = frappe._dict(endpoint=endpoint, queries=[], started=time.perf_counter(), rows_read=get_rows_read())
+            frappe.local.insightly_profile = profile
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                frappe.local.insightly_profile = None
+
+            finish_profile(profile, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def finish_profile(profile, result):
+    total_ms = (time.perf_counter() - profile.started) * 1000
+    sql_ms = sum(query["ms"] for query in profile.queries)
+
+    sample = {
+        "endpoint": profile.endpoint,
+        "timestamp": frappe.utils.now(),
+        "user": frappe.session.user,
+        "database": "primary" if db.get_connection() is frappe.db else "replica",
+        "total_ms": round(total_ms, 2),
+        "sql_ms": round(sql_ms, 2),
+        "python_ms": round(total_ms - sql_ms, 2),
+        "query_count": len(profile.queries),
+        "rows_read": max(get_rows_read() - profile.rows_read, 0),
+        "rows_returned": sum(query["rows"] for query in profile.queries),
+        # Streamed exports are sized by the client, not here
+        "payload_bytes": len(frappe.as_json(result, indent=None).encode()) if isinstance(result, (dict, list, str)) else None,
+        "queries": sorted(profile.queries, key=lambda query: query["ms"], reverse=True)[:MAX_SAMPLE_QUERIES],
+    }
+
+    cache = frappe.cache()
+    cache.lpush(PROFILE_SAMPLES_KEY, json.dumps(sample))
+    cache.ltrim(PROFILE_SAMPLES_KEY, 0, MAX_SAMPLES - 1)
+
+    frappe.local.insightly_timing = ";".join(
+        f"{key}={sample[key]}" for key in ("total_ms", "sql_ms", "python_ms", "query_count", "rows_read", "payload_bytes")
+    )
+
+    if total_ms >= cint(frappe.conf.get("insightly_slow_request_ms", DEFAULT_SLOW_REQUEST_MS)):
+        frappe.logger("insightly").warning(f"Slow Insightly request: {json.dumps(sample)}")
+
+
+def add_timing_header(response=None, request=None):
+    # After Request Hook: Exposing The Profile Of This Request As X-Insightly-Timing
+    timing = getattr(frappe.local, "insightly_timing", None)
+    if timing and response is not None and cint(frappe.conf.get("insightly_timing_header")):
+        response.headers["X-Insightly-Timing"] = timing
+
+
+def get_rows_read():
+    # Rows Read By The Storage Engine In This Session (index and table reads) of the analytics connection
+    return sum(
+        cint(row[1])
+        for row in db.get_connection().sql("SHOW SESSION STATUS WHERE Variable_name LIKE 'Handler_read%%'")
+    )
+
+
+@frappe.whitelist()
+def get_profiling_stats(endpoint=None, samples=20):
+    # Per Endpoint Summary Of The Recorded Samples, Plus The Most Recent Samples
+    frappe.only_for("System Manager")
+
+    recorded = [json.loads(sample) for sample in frappe.cache().lrange(PROFILE_SAMPLES_KEY, 0, MAX_SAMPLES - 1)]
+    if endpoint:
+        recorded = [sample for sample in recorded if sample["endpoint"] == endpoint]
+
+    endpoints = {}
+    for sample in recorded:
+        endpoints.setdefault(sample["endpoint"], []).append(sample)
+
+    return {
+        "enabled": cint(frappe.conf.get("insightly_profiling")),
+        "endpoints": {name: summarize(endpoint_samples) for name, endpoint_samples in endpoints.items()},
+        "samples": recorded[:cint(samples)],
+    }
+
+
+def summarize(samples):
+    total_ms = sorted(sample["total_ms"] for sample in samples)
+
+    def average(key):
+        values = [sample[key] for sample in samples if sample[key] is not None]
+        return round(flt(sum(values)) / len(values), 2) if values else None
+
+    return {
+        "count": len(samples),
+        "avg_ms": average("total_ms"),
+        "p95_ms": total_ms[min(int(len(total_ms) * 0.95), len(total_ms) - 1)],
+        "max_ms": total_ms[-1],
+        "avg_sql_ms": average("sql_ms"),
+        "avg_python_ms": average("python_ms"),
+        "avg_query_count": average("query_count"),
+        "avg_rows_read": average("rows_read"),
+        "avg_payload_bytes": average("payload_bytes"),
+    }
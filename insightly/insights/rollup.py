@@ -0,0 +1,247 @@
+import hashlib
+
+import frappe
+from frappe.utils import getdate, now
+
+from insightly.insights.cycles import CYCLES
+from insightly.insights.dates import get_window_conditions, get_window_values
+
+ROLLUP_DOCTYPE = "Insightly Party Rollup"
+ROLLUP_COLUMNS = ["record_count", "total", "grand_total", "qty", "outstanding"]
+
+# Invoices whose outstanding amount changes when another document is submitted or cancelled
+# (payments, journal entries, returns, reconciliation and advance allocation, see get_settled_invoices)
+SETTLED_INVOICES = ("Sales Invoice", "Purchase Invoice")
+
+
+def update_party_rollup(doc, method=None):
+    # Doc Event: Queueing The Daily Rollup Rows Touched By A Submitted Or Cancelled Document
+    keys = {
+        (party_type, source.doctype, doc.get(source.party_field), doc.get(source.date_field))
+        for party_type, source in get_doc_sources(doc.doctype, doc)
+    }
+
+    # Payments, journal entries and returns change the outstanding amount of the invoices they settle
+    for invoice_doctype, invoice_name in get_settled_invoices(doc):
+        for party_type, source in get_doc_sources(invoice_doctype):
+            invoice = frappe.db.get_value(invoice_doctype, invoice_name, [source.party_field, source.date_field], as_dict=True)
+            if invoice:
+                keys.add((party_type, source.doctype, invoice.get(source.party_field), invoice.get(source.date_field)))
+
+    queue_rollup_refresh(keys)
+
+
+def queue_rollup_refresh(keys):
+    # Rows are recomputed once the transaction commits: a recompute inside it would only see its own snapshot,
+    # so two documents of the same party and day submitted at once could overwrite each other's totals
+    keys = {(party_type, doctype, party, getdate(posting_date)) for party_type, doctype, party, posting_date in keys if party and posting_date}
+    if not keys:
+        return
+
+    if getattr(frappe.local, "insightly_rollup_queue", None) is None:
+        frappe.local.insightly_rollup_queue = set()
+        frappe.db.after_commit.add(commit_queued_rollups)
+        frappe.db.after_rollback.add(discard_queued_rollups)
+
+    frappe.local.insightly_rollup_queue.update(keys)
+
+
+def commit_queued_rollups():
+    # After Commit: Recomputing The Queued Rows In A Transaction Of Their Own
+    refresh_queued_rollups()
+    frappe.db.commit()
+
+
+def refresh_queued_rollups():
+    keys = getattr(frappe.local, "insightly_rollup_queue", None) or set()
+    frappe.local.insightly_rollup_queue = None
+    refresh_party_rollups(keys)
+
+
+def discard_queued_rollups():
+    frappe.local.insightly_rollup_queue = None
+
+
+def refresh_party_rollups(keys):
+    # Rebuilding (party type, doctype, party, date) Rows From Their Source Doctypes, Serialised Per Row
+    # Every row is locked first, in name order so concurrent refreshes queue up instead of deadlocking; the
+    # sources are then summed with a locking read, which sees every committed document rather than a snapshot,
+    # so whichever refresh of a row runs last writes totals that include every document committed before it
+    rows = sorted(
+        (get_rollup_name(party_type, party, doctype, posting_date), party_type, get_source(party_type, doctype), party, posting_date)
+        for party_type, doctype, party, posting_date in keys
+    )
+
+    for name, party_type, source, party, posting_date in rows:
+        lock_rollup_row(name, party_type, source, party, posting_date, now())
+
+    # Stamped once the locks are held, so waiting for them does not widen the gap to the commit
+    timestamp = now()
+    for name, party_type, source, party, posting_date in rows:
+        refresh_party_rollup(name, party_type, source, party, posting_date, timestamp)
+
+
+def lock_rollup_row(name, party_type, source, party, posting_date, timestamp):
+    # Inserting An Empty Row When Missing; Either Way The Row Stays Locked Until Commit
+    frappe.db.sql(f"""
+        INSERT INTO `tab{ROLLUP_DOCTYPE}`
+            (name, creation, modified, modified_by, owner, party_type, party, reference_doctype, posting_date,
+            {", ".join(ROLLUP_COLUMNS)})
+        VALUES
+            (%(name)s, %(timestamp)s, %(timestamp)s, %(user)s, %(user)s, %(party_type)s, %(party)s,
+            %(reference_doctype)s, %(posting_date)s, {", ".join("0" for column in ROLLUP_COLUMNS)})
+        ON DUPLICATE KEY UPDATE name = name
+    """, {
+        "name": name,
+        "timestamp": timestamp,
+        "user": frappe.session.user,
+        "party_type": party_type,
+        "party": party,
+        "reference_doctype": source.doctype,
+        "posting_date": posting_date,
+    })
+
+
+def refresh_party_rollup(name, party_type, source, party, posting_date, timestamp):
+    totals = frappe.db.sql(f"""
+        SELECT {get_column_expressions(source)}
+        FROM `tab{source.doctype}`
+        WHERE {get_source_conditions(source)}
+            AND {source.party_field} = %(party)s
+            AND {get_window_conditions(source.date_field)}
+        LOCK IN SHARE MODE
+    """, {
+        "party_type": party_type,
+        "party": party,
+        **get_window_values(posting_date, posting_date),
+    }, as_dict=True)[0]
+
+    # Rows are kept with zero totals after a cancellation so the change is still visible by `modified`
+    frappe.db.sql(f"""
+        UPDATE `tab{ROLLUP_DOCTYPE}`
+        SET modified = %(timestamp)s, modified_by = %(user)s,
+            {", ".join(f"{column} = %({column})s" for column in ROLLUP_COLUMNS)}
+        WHERE name = %(name)s
+    """, {
+        "name": name,
+        "timestamp": timestamp,
+        "user": frappe.session.user,
+        **{column: totals.get(column) or 0 for column in ROLLUP_COLUMNS},
+    })
+
+
+def rebuild_party_rollup(party_types=None, doctypes=None):
+    # Recomputing The Whole Rollup (or the given party types / doctypes) With One INSERT ... SELECT Per Doctype
+    for party_type, cycle in CYCLES.items():
+        if party_types and party_type not in party_types:
+            continue
+
+        for source in cycle.sources:
+            if doctypes and source.doctype not in doctypes:
+                continue
+            if not frappe.db.table_exists(source.doctype):
+                continue
+
+            rebuild_source_rollup(party_type, source)
+
+
+def rebuild_source_rollup(party_type, source):
+    posting_date = f"DATE({source.date_field})"
+    values = {"party_type": party_type, "reference_doctype": source.doctype, "timestamp": now(), "user": frappe.session.user}
+
+    frappe.db.sql(f"""
+        DELETE FROM `tab{ROLLUP_DOCTYPE}`
+        WHERE party_type = %(party_type)s AND reference_doctype = %(reference_doctype)s
+    """, values)
+
+    frappe.db.sql(f"""
+        INSERT INTO `tab{ROLLUP_DOCTYPE}`
+            (name, creation, modified, modified_by, owner, party_type, party, reference_doctype, posting_date,
+            {", ".join(ROLLUP_COLUMNS)})
+        SELECT
+            MD5(CONCAT_WS('|', %(party_type)s, {source.party_field}, %(reference_doctype)s, {posting_date})),
+            %(timestamp)s, %(timestamp)s, %(user)s, %(user)s, %(party_type)s, {source.party_field},
+            %(reference_doctype)s, {posting_date}, {get_column_expressions(source, aliased=False)}
+        FROM `tab{source.doctype}`
+        WHERE {get_source_conditions(source)} AND IFNULL({source.party_field}, '') != ''
+        GROUP BY {source.party_field}, {posting_date}
+    """, values)
+
+
+def get_doc_sources(doctype, doc=None):
+    # Yielding (party_type, source) pairs the document contributes to
+    for party_type, cycle in CYCLES.items():
+        for source in cycle.sources:
+            if source.doctype != doctype:
+                continue
+            if doc and source.get("party_type_field") and doc.get(source.party_type_field) != party_type:
+                continue
+
+            yield party_type, source
+
+
+def get_source(party_type, doctype):
+    return next(source for source in CYCLES[party_type].sources if source.doctype == doctype)
+
+
+def get_affected_parties(doc):
+    # (party_type, party) Pairs Whose Insights Change With The Document, Including Settled Invoices
+    parties = set()
+    for party_type, source in get_doc_sources(doc.doctype, doc):
+        parties.add((party_type, doc.get(source.party_field)))
+
+    for invoice_doctype, invoice_name in get_settled_invoices(doc):
+        for party_type, source in get_doc_sources(invoice_doctype):
+            parties.add((party_type, frappe.db.get_value(invoice_doctype, invoice_name, source.party_field)))
+
+    return {(party_type, party) for party_type, party in parties if party}
+
+
+def get_settled_invoices(doc):
+    if doc.doctype == "Payment Entry":
+        return {
+            (reference.reference_doctype, reference.reference_name)
+            for reference in doc.get("references") or []
+            if reference.reference_doctype in SETTLED_INVOICES
+        }
+
+    if doc.doctype == "Journal Entry":
+        return {
+            (account.reference_type, account.reference_name)
+            for account in doc.get("accounts") or []
+            if account.reference_type in SETTLED_INVOICES and account.reference_name
+        }
+
+    # Every posting that changes an invoice's outstanding amount submits a Payment Ledger Entry against it, including
+    # reconciliation, advance allocation and the reversals made on cancel
+    if doc.doctype == "Payment Ledger Entry":
+        if doc.get("against_voucher_type") in SETTLED_INVOICES and doc.get("against_voucher_no"):
+            return {(doc.against_voucher_type, doc.against_voucher_no)}
+        return set()
+
+    if doc.doctype in SETTLED_INVOICES and doc.get("is_return") and doc.get("return_against"):
+        return {(doc.doctype, doc.return_against)}
+
+    return set()
+
+
+def get_column_expressions(source, aliased=True):
+    expressions = []
+    for column in ROLLUP_COLUMNS:
+        expression = "COUNT(*)" if column == "record_count" else f"SUM({source.columns[column]})" if column in source.columns else "0"
+        expressions.append(f"{expression} AS {column}" if aliased else expression)
+
+    return ", ".join(expressions)
+
+
+def get_source_conditions(source):
+    conditions = ["docstatus = 1"]
+    if source.get("party_type_field"):
+        conditions.append(f"{source.party_type_field} = %(party_type)s")
+
+    return " AND ".join(conditions)
+
+
+def get_rollup_name(party_type, party, doctype, posting_date):
+    # Deterministic name so the same day's row is upserted; matches the MD5 used by rebuild_source_rollup
+    return hashlib.md5("|".join([party_type, party, doctype, str(posting_date)]).encode()).hexdigest()
@@ -0,0 +1,47 @@
+import frappe
+from frappe.utils import cint
+
+REQUEST_PREFIX = "insightly|request"
+
+# Long enough to outlive any synchronous insights request
+REQUEST_TTL = 10 * 60
+
+# Raising the page's latest sequence atomically, so two requests racing cannot lower it
+RAISE_SEQUENCE = """
+local current = tonumber(redis.call("GET", KEYS[1]) or "0")
+if current < tonumber(ARGV[1]) then
+    redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[2])
+end
+"""
+
+
+class RequestSuperseded(frappe.ValidationError):
+    pass
+
+
+def start_request(request_id):
+    # Recording The Latest Request Of A Page Instance
+    # request_id is "<page instance>:<sequence>"; returns a check that raises RequestSuperseded
+    # once the same page has started a newer request
+    if not request_id:
+        return lambda: None
+
+    client, _, sequence = request_id.rpartition(":")
+    sequence = cint(sequence)
+
+    # Plain integers under the prefixed key, read with the raw client: get_value would memoise the first read
+    # for the rest of the request and never see a newer sequence
+    cache = frappe.cache()
+    key = cache.make_key(get_request_key(client))
+    cache.eval(RAISE_SEQUENCE, 1, key, sequence, REQUEST_TTL)
+
+    def check():
+        if cint(cache.get(key)) > sequence:
+            raise RequestSuperseded(request_id)
+
+    check()
+    return check
+
+
+def get_request_key(client):
+    return f"{REQUEST_PREFIX}|{frappe.session.user}|{client}"
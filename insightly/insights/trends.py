@@ -0,0 +1,103 @@
+import frappe
+from frappe.utils import add_days, add_months, date_diff, flt, getdate
+
+from insightly.insights import db
+from insightly.insights.aggregation import ROLLUP_FIELDS, get_query_values, get_rollup_conditions
+from insightly.insights.cache import get_cached_result
+from insightly.insights.party_insights import get_date_range
+
+# Bucket -> SQL expression of the bucket's first day (weeks start on Monday)
+TREND_BUCKETS = {
+    "day": "posting_date",
+    "week": "ADDDATE(posting_date, -WEEKDAY(posting_date))",
+    "month": "DATE_FORMAT(posting_date, '%%Y-%%m-01')",
+}
+
+# Series -> aggregate of the cycle's invoice doctype (see aggregation.ROLLUP_FIELDS)
+TREND_SERIES = {
+    "invoiced": "total_amount",
+    "paid": "paid_amount",
+    "pending": "pending_amount",
+}
+
+# One page of the compact grid
+MAX_TREND_PARTIES = 500
+
+
+def get_party_trends(cycle, parties, filters=None, bucket=None):
+    # Shared Implementation Of get_customer_trends / get_supplier_trends
+    # Invoiced, paid and pending amount per party and day / week / month of the filtered date range, as
+    # {"bucket": ..., "buckets": [first day, ...], "series": {party: {"invoiced": [...], "paid": [...], "pending": [...]}}}
+    # Every series has one value per bucket; parties without invoices in range are left out
+    parties = frappe.parse_json(parties) or []
+    filters = frappe.parse_json(filters) or frappe._dict()
+    start_date, end_date = get_date_range(filters)
+    bucket = bucket or get_default_bucket(start_date, end_date)
+
+    if bucket not in TREND_BUCKETS:
+        frappe.throw(frappe._("Invalid trend bucket {0}").format(bucket))
+    if len(parties) > MAX_TREND_PARTIES:
+        frappe.throw(frappe._("Trends can be fetched for at most {0} parties at once").format(MAX_TREND_PARTIES))
+
+    return get_cached_result(
+        "get_party_trends", cycle.party_type,
+        {"parties": parties, "bucket": bucket, "start_date": start_date, "end_date": end_date},
+        parties,
+        lambda: build_party_trends(cycle, parties, start_date, end_date, bucket),
+    )
+
+
+def build_party_trends(cycle, parties, start_date, end_date, bucket):
+    # One Grouped Query Over The Rollup For All Parties
+    buckets = [str(day) for day in get_buckets(start_date, end_date, bucket)]
+    result = {"bucket": bucket, "buckets": buckets, "series": {}}
+    if not parties:
+        return result
+
+    source = get_trend_source(cycle)
+    values = get_query_values(cycle, start_date, end_date, parties)
+    values["doctypes"] = (source.doctype,)
+    fields = ", ".join(f"SUM({ROLLUP_FIELDS[field]}) AS {name}" for name, field in TREND_SERIES.items())
+
+    rows = db.sql(f"""
+        SELECT party, {TREND_BUCKETS[bucket]} AS bucket, {fields}
+        FROM `tabInsightly Party Rollup`
+        WHERE {get_rollup_conditions(parties)}
+        GROUP BY party, bucket
+    """, values, as_dict=True)
+
+    positions = {day: idx for idx, day in enumerate(buckets)}
+    for row in rows:
+        series = result["series"].setdefault(row.party, {name: [0] * len(buckets) for name in TREND_SERIES})
+        idx = positions[str(getdate(row.bucket))]
+        for name in TREND_SERIES:
+            series[name][idx] = flt(row[name], 2)
+
+    return result
+
+
+def get_trend_source(cycle):
+    # The Invoice Doctype: The Source With Paid And Pending Amounts
+    return next(source for source in cycle.sources if "pending_amount" in source.fields)
+
+
+def get_default_bucket(start_date, end_date):
+    # Roughly 30 points or fewer per sparkline
+    days = date_diff(end_date, start_date) + 1
+    return "day" if days <= 31 else "week" if days <= 183 else "month"
+
+
+def get_buckets(start_date, end_date, bucket):
+    # First Day Of Every Bucket Overlapping The Range
+    day, end_date = getdate(start_date), getdate(end_date)
+    if bucket == "week":
+        day = add_days(day, -day.weekday())
+    elif bucket == "month":
+        day = day.replace(day=1)
+
+    buckets = []
+    while day <= end_date:
+        buckets.append(day)
+        day = add_months(day, 1) if bucket == "month" else add_days(day, 7 if bucket == "week" else 1)
+
+    return buckets
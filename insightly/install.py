@@ -0,0 +1,8 @@
+from insightly.insights.indexes import add_insights_indexes
+from insightly.insights.rollup import rebuild_party_rollup
+
+
+def after_install():
+    # Create the covering indexes, then seed the daily party rollup from existing transactions
+    add_insights_indexes()
+    rebuild_party_rollup()
@@ -0,0 +1,6 @@
+from insightly.insights.indexes import add_insights_indexes
+
+
+def execute():
+    # Covering (party, docstatus, date, amounts) indexes for the insights queries
+    add_insights_indexes()
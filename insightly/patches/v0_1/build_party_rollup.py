@@ -0,0 +1,8 @@
+from insightly.insights.cache import clear_insights_cache
+from insightly.insights.rollup import rebuild_party_rollup
+
+
+def execute():
+    # Populate the daily party rollup the insights pages now read from
+    rebuild_party_rollup()
+    clear_insights_cache()
@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+    # The cached entries are now indexed in a sorted set under the cache prefix; the old list is never trimmed
+    frappe.cache().delete_value("insightly|cache_entries")
@@ -0,0 +1,10 @@
+from insightly.insights.cache import clear_insights_cache
+from insightly.insights.indexes import add_insights_indexes
+from insightly.insights.rollup import rebuild_party_rollup
+
+
+def execute():
+    # Payment Requests are now dated by transaction_date instead of creation
+    add_insights_indexes()
+    rebuild_party_rollup(doctypes=["Payment Request"])
+    clear_insights_cache()
@@ -0,0 +1,1072 @@
+// Shared Customer / Supplier Insights Page
+// Each page passes its party type, labels, server methods and doctype sections as options.
+
+frappe.provide("insightly");
+
+insightly.PartyInsights = class PartyInsights {
+	constructor(wrapper, opts) {
+		this.wrapper = wrapper;
+		this.opts = opts;
+
+		// Filters
+		this.filters = {
+			party: [],
+			party_group: "",
+			date_range: "Last Week",
+			selected_date_range: [frappe.datetime.month_start(), frappe.datetime.now_date()],
+			compare: "",
+		};
+
+		// Server Side Paging And Sorting
+		this.paging = {
+			page: 1,
+			page_length: 20,
+			total: 0,
+			order_by: "party",
+			top_n: 0,
+		};
+
+		// Drill-Down Rows Fetched Per Request, Matches The Server Default
+		this.detail_page_length = 100;
+
+		// "Cards" shows one page in the DataTable, "Compact" scrolls every party in a virtualised grid,
+		// "Ageing" scrolls the receivable / payable ageing of every party
+		this.view = "Cards";
+		this.grid_page_length = 500;
+		this.schema = [];
+
+		// Delta Refresh Of The Visible Rows
+		this.rows = [];
+		this.watermark = null;
+		this.refresh_interval = 60 * 1000;
+
+		// Request Scheduling: Debounced Filter Changes, Latest Request Wins
+		this.client_id = frappe.utils.get_random(8);
+		this.request_seq = 0;
+		this.current_request = null;
+		this.fetch_delay = 400;
+
+		// Invoiced / Paid / Pending Sparklines Of The Listed Parties, Fetched With One Call Per Page
+		this.trends = {};
+
+		// Opt-In Live Mode, Rows Pushed On Submit / Cancel
+		this.live = false;
+		this.live_subscription = null;
+
+		this.reset_details();
+		this.make_page();
+		this.make_filters();
+		this.make_table();
+		this.make_pager();
+		this.fetch_insights();
+		this.start_auto_refresh();
+	}
+
+	make_page() {
+		this.page = frappe.ui.make_app_page({
+			parent: this.wrapper,
+			title: this.opts.title,
+			single_column: true,
+		});
+
+		$(`<style>
+			.dt-cell__content {
+				text-align: left !important;
+			}
+		</style>`).appendTo(this.page.main);
+
+		if (this.opts.export_method) {
+			this.page.add_menu_item(__("Export CSV"), () => this.export_insights("csv"));
+			this.page.add_menu_item(__("Export NDJSON"), () => this.export_insights("ndjson"));
+		}
+	}
+
+	make_filters() {
+		// Create filter form on page
+		let me = this;
+		let filters = this.filters;
+		let paging = this.paging;
+
+		this.form = new frappe.ui.FieldGroup({
+			fields: [
+				{
+					fieldtype: "MultiSelectList",
+					label: this.opts.party_label,
+					fieldname: "party",
+					options: this.opts.party_type,
+					get_data: function (txt) {
+						// Served from the cached party directory, narrowed to the selected group
+						if (me.opts.search_method) {
+							return frappe.xcall(me.opts.search_method, { txt: txt, party_group: filters.party_group });
+						}
+						return frappe.db.get_link_options(me.opts.party_type, txt);
+					},
+					onchange: function () {
+						filters.party = this.values;
+						me.schedule_fetch();
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					fieldtype: "Link",
+					label: this.opts.group_doctype,
+					fieldname: "party_group",
+					options: this.opts.group_doctype,
+					onchange: function () {
+						filters.party_group = this.value;
+						me.schedule_fetch();
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					fieldtype: "Select",
+					label: "Date Range",
+					fieldname: "date_range",
+					default: "Last Week",
+					options: ["Last Week", "Last Month", "Last 3 Months", "Last Year", "Select Date Range"],
+					onchange: function () {
+						filters.date_range = this.value;
+						me.schedule_fetch();
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					label: "Select Date Range",
+					fieldtype: "Date Range",
+					fieldname: "selected_date_range",
+					depends_on: "eval:doc.date_range == 'Select Date Range'",
+					default: [frappe.datetime.month_start(), frappe.datetime.now_date()],
+					onchange: function () {
+						filters.selected_date_range = this.value;
+						me.schedule_fetch();
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					fieldtype: "Select",
+					label: "Compare With",
+					fieldname: "compare",
+					options: ["", "Previous Period", "Previous Year"],
+					onchange: function () {
+						filters.compare = this.value;
+						// The compact grid gets a change column per doctype
+						me.reset_grid();
+						me.schedule_fetch();
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					fieldtype: "Select",
+					label: "Sort By",
+					fieldname: "order_by",
+					default: "party",
+					options: [{ label: this.opts.party_type, value: "party" }, ...this.opts.sort_options],
+					onchange: function () {
+						paging.order_by = this.value;
+						me.schedule_fetch();
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					fieldtype: "Int",
+					label: "Top N",
+					fieldname: "top_n",
+					description: "Leave empty to show all",
+					onchange: function () {
+						paging.top_n = this.value;
+						me.schedule_fetch();
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					fieldtype: "Select",
+					label: "View",
+					fieldname: "view",
+					default: "Cards",
+					options: ["Cards", "Compact", ...(this.opts.ageing_method ? ["Ageing"] : [])],
+					onchange: function () {
+						me.set_view(this.value);
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					fieldtype: "Check",
+					label: "Live Updates",
+					fieldname: "live",
+					description: "Update rows as documents are submitted",
+					onchange: function () {
+						me.toggle_live(this.value);
+					},
+				},
+			],
+			body: this.page.body,
+		});
+		this.form.make();
+	}
+
+	make_table() {
+		// Create a table container, with a container for the compact grid next to it
+		this.results = $(`<div class="party-insights-results mt-3"></div>`).appendTo(this.page.main);
+		this.table_container = $(`<div class="party-insights-table"></div>`).appendTo(this.results);
+		this.grid_container = $(`<div class="party-insights-grid hide"></div>`).appendTo(this.results);
+		this.ageing_container = $(`<div class="party-insights-ageing hide"></div>`).appendTo(this.results);
+
+		// Initialize DataTable
+		this.data_table = new frappe.DataTable(this.table_container[0], {
+			columns: [
+				{ name: this.opts.party_type, width: 300, fieldtype: "Data", editable: false },
+				...this.opts.sections.map((section) => ({
+					name: section.doctype,
+					width: 250,
+					fieldtype: "Data",
+					editable: false,
+				})),
+			],
+			data: [],
+			cellHeight: 200,
+			inlineFilters: false,
+			noDataMessage: "No records found",
+		});
+
+		// Open Doctype Wise Details From Any Details Button In The Table Or The Grid's Expanded Rows
+		let me = this;
+		this.results.on("click", ".details-btn", function () {
+			me.open_details($(this).data("party"), $(this).data("doctype"), $(this).data("details"));
+		});
+	}
+
+	make_pager() {
+		// Pager Below The Table
+		this.pager = $(`<div class="party-insights-pager d-flex justify-content-between align-items-center mt-3">
+			<span class="text-muted pager-info"></span>
+			<div>
+				<button class="btn btn-default btn-xs pager-prev">${__("Previous")}</button>
+				<button class="btn btn-default btn-xs pager-next">${__("Next")}</button>
+			</div>
+		</div>`).appendTo(this.page.main);
+
+		this.pager.find(".pager-prev").on("click", () => this.fetch_insights(this.paging.page - 1));
+		this.pager.find(".pager-next").on("click", () => this.fetch_insights(this.paging.page + 1));
+	}
+
+	schedule_fetch() {
+		// Debounce Filter Changes, So Picking Several Parties In A Row Sends One Request
+		clearTimeout(this.fetch_timer);
+		this.fetch_timer = setTimeout(() => this.fetch_insights(), this.fetch_delay);
+	}
+
+	fetch_insights(page_no = 1) {
+		// Fetching One Page Of Insights Data Based On Filter Changes
+		// Only the latest request may update the page; an older one still in flight is aborted
+		clearTimeout(this.fetch_timer);
+		if (this.view === "Ageing") {
+			this.fetch_ageing(page_no);
+			return;
+		}
+		let run_async = this.is_heavy_request();
+		let request_seq = ++this.request_seq;
+		this.reset_details();
+		this.subscribe_live();
+
+		if (this.current_request && this.current_request.abort) {
+			this.current_request.abort();
+		}
+		if (this.job_key) {
+			// Progress of a job started for earlier filters is no longer of interest
+			this.job_key = null;
+			frappe.hide_progress();
+		}
+		this.page.set_indicator(__("Loading..."), "orange");
+
+		this.current_request = frappe.call({
+			method: this.opts.insights_method,
+			args: {
+				filters: this.filters,
+				page: page_no,
+				page_length: this.paging.page_length,
+				order_by: this.paging.order_by,
+				top_n: this.paging.top_n || 0,
+				run_async: run_async ? 1 : 0,
+				response_format: "columnar",
+				request_id: `${this.client_id}:${request_seq}`,
+			},
+			callback: (r) => {
+				// Responses arriving out of order, or abandoned by the server, are dropped
+				if (request_seq !== this.request_seq || !r.message || r.message.superseded) {
+					return;
+				}
+
+				if (r.message.job_key) {
+					this.handle_job(r.message);
+				} else {
+					this.render_insights(r.message);
+				}
+			},
+			always: () => {
+				if (request_seq === this.request_seq) {
+					this.current_request = null;
+					this.page.clear_indicator();
+				}
+			},
+		});
+	}
+
+	is_heavy_request() {
+		// Unfiltered requests over three months or more run as a background job
+		if (this.filters.party && this.filters.party.length) {
+			return false;
+		}
+		if (this.filters.date_range === "Select Date Range") {
+			let [from_date, to_date] = this.filters.selected_date_range || [];
+			return from_date && to_date && frappe.datetime.get_day_diff(to_date, from_date) >= 90;
+		}
+		return ["Last 3 Months", "Last Year"].includes(this.filters.date_range);
+	}
+
+	handle_job(job) {
+		// Background Job Mode: Show Progress Until The Shared Job Publishes Its Result
+		if (job.status === "finished") {
+			this.render_insights(job.result);
+			return;
+		}
+
+		this.job_key = job.job_key;
+		frappe.show_progress(this.opts.title, 0, 100, __("Queued"));
+
+		if (!this.progress_handler) {
+			this.progress_handler = (data) => this.on_job_progress(data);
+			frappe.realtime.on("insightly_insights_progress", this.progress_handler);
+		}
+	}
+
+	on_job_progress(data) {
+		// Ignore progress of jobs started for earlier filters
+		if (data.job_key !== this.job_key) {
+			return;
+		}
+
+		if (data.status === "running") {
+			frappe.show_progress(this.opts.title, data.percent, 100, __(data.description || ""));
+			return;
+		}
+
+		frappe.hide_progress();
+		this.job_key = null;
+
+		if (data.status === "failed") {
+			frappe.msgprint(__("Could not compute {0}, please try again.", [this.opts.title]));
+			return;
+		}
+
+		frappe.call({
+			method: "insightly.insights.jobs.get_insights_job_result",
+			args: { job_key: data.job_key },
+			callback: (r) => r.message && this.render_insights(r.message),
+		});
+	}
+
+	render_insights(message) {
+		this.paging.page = message.page;
+		this.paging.total = message.total;
+		let rows =
+			message.format === "columnar" ? this.decode_columnar(message) : this.decode_rows(message.columns, message.rows);
+		this.schema = message.format === "columnar" ? Object.keys(message.columns) : message.columns;
+		this.set_comparison(message.previous_dates);
+
+		// Appended grid pages keep the first page's watermark, so no change in between is skipped
+		if (this.view !== "Compact" || message.page === 1) {
+			this.watermark = message.watermark;
+		}
+
+		if (this.view !== "Compact" || message.page === 1) {
+			this.trends = {};
+		}
+		this.fetch_trends(rows);
+
+		if (this.view === "Compact") {
+			this.update_grid(rows, message.page > 1);
+			return;
+		}
+
+		this.rows = rows;
+		this.update_table(rows);
+		this.update_pager();
+		this.prefetch_details(rows);
+	}
+
+	fetch_trends(rows) {
+		// Series Of Every Listed Party In One Request, Redrawn Once They Arrive
+		if (!this.opts.trends_method || !rows.length) {
+			return;
+		}
+
+		let generation = this.details_generation;
+		frappe
+			.xcall(this.opts.trends_method, {
+				parties: rows.map((row) => row.party),
+				filters: this.filters,
+			})
+			.then((r) => {
+				if (generation !== this.details_generation) {
+					return;
+				}
+				Object.assign(this.trends, r.series);
+				if (this.view === "Compact") {
+					this.grid && this.grid.invalidate();
+				} else {
+					this.update_table(this.rows);
+				}
+			});
+	}
+
+	get_sparkline_html(party) {
+		// Invoiced Amount Per Bucket As A Line, Paid Amount As A Fainter One
+		let series = this.trends[party];
+		if (!series) {
+			return "";
+		}
+
+		let width = 120;
+		let height = 24;
+		let max = Math.max(...series.invoiced, ...series.paid) || 1;
+		let step = width / Math.max(series.invoiced.length - 1, 1);
+		let points = (values) =>
+			values.map((value, idx) => `${(idx * step).toFixed(1)},${(height - (value / max) * height).toFixed(1)}`).join(" ");
+		let pending = series.pending[series.pending.length - 1] || 0;
+
+		return `<svg width="${width}" height="${height}" class="party-trend">
+			<title>${__("Invoiced and paid amount over the selected range, pending {0} in the last period", [format_number(pending)])}</title>
+			<polyline points="${points(series.paid)}" fill="none" stroke="var(--green-400)" stroke-width="1" />
+			<polyline points="${points(series.invoiced)}" fill="none" stroke="var(--blue-500)" stroke-width="1.5" />
+		</svg>`;
+	}
+
+	set_view(view) {
+		// Switch Between The Paged Cards And The Compact Virtualised Grid
+		this.view = view || "Cards";
+		let compact = this.view === "Compact";
+		let ageing = this.view === "Ageing";
+		this.table_container.toggleClass("hide", compact || ageing);
+		this.pager.toggleClass("hide", compact || ageing);
+		this.grid_container.toggleClass("hide", !compact);
+		this.ageing_container.toggleClass("hide", !ageing);
+
+		this.paging.page_length = compact ? this.grid_page_length : 20;
+		this.fetch_insights();
+	}
+
+	set_comparison(previous_dates) {
+		// Show The Period The Rows Are Compared With Under The Title
+		this.page.set_title_sub(
+			previous_dates
+				? __("Compared with {0} to {1}", previous_dates.map((date) => frappe.datetime.str_to_user(date)))
+				: ""
+		);
+	}
+
+	update_grid(rows, append) {
+		// Compact View: Flat Numeric Columns, Pages Appended As The Grid Is Scrolled
+		if (!this.grid) {
+			this.make_grid();
+		}
+
+		let values = rows.map((row) => this.get_grid_row(row));
+		if (append) {
+			this.rows = this.rows.concat(rows);
+			this.grid.append_rows(values);
+		} else {
+			this.rows = rows;
+			this.grid.viewport.scrollTop(0);
+			this.grid.set_rows(values);
+		}
+	}
+
+	reset_grid() {
+		// Rebuilt With The Current Schema On The Next Render
+		if (this.grid) {
+			this.grid_container.empty();
+			this.grid = null;
+		}
+	}
+
+	make_grid() {
+		this.grid_columns = this.get_grid_columns();
+		this.grid = new insightly.VirtualTable(this.grid_container, {
+			columns: this.grid_columns,
+			height: 600,
+			row_height: 36,
+			expanded_height: 220,
+			formatter: (value, column, idx) => this.format_grid_value(value, column, this.rows[idx]),
+			get_expanded_html: (idx) => this.get_expanded_html(this.rows[idx]),
+			on_scroll_end: () => this.load_more_grid(),
+		});
+	}
+
+	get_grid_columns() {
+		// Party Name And Trend, Then Record Count, Amount, (When Comparing) Amount Change And (Where Available) Pending Amount Per Doctype
+		let columns = [{ fieldname: "party_name", label: this.opts.party_type, width: "2fr" }];
+		if (this.opts.trends_method) {
+			columns.push({ fieldname: "trend", label: __("Trend"), width: "140px" });
+		}
+		this.opts.sections.forEach((section) => {
+			columns.push({ fieldname: `${section.key}.total_records`, label: section.doctype, fieldtype: "Int" });
+			columns.push({ fieldname: `${section.key}.total_amount`, label: __("Amount"), fieldtype: "Currency" });
+			if (this.schema.includes(`${section.key}.total_amount_delta`)) {
+				columns.push({ fieldname: `${section.key}.total_amount_delta`, label: __("Change"), fieldtype: "Currency", change: 1 });
+			}
+			if (this.schema.includes(`${section.key}.pending_amount`)) {
+				columns.push({ fieldname: `${section.key}.pending_amount`, label: __("Pending"), fieldtype: "Currency" });
+			}
+		});
+		return columns;
+	}
+
+	get_grid_row(row) {
+		return this.grid_columns.map((column) => {
+			if (column.fieldname === "trend") {
+				return row.party;
+			}
+			let [section, field] = column.fieldname.split(".");
+			return field ? (row[section] || {})[field] || 0 : row.party_name || row.party;
+		});
+	}
+
+	format_grid_value(value, column, row) {
+		if (column.fieldname === "trend") {
+			return this.get_sparkline_html(value);
+		}
+		if (column.change) {
+			return this.get_change_html(value, `${this.get_sign(value)}${format_currency(Math.abs(value), row.currency)}`);
+		}
+		if (column.fieldtype === "Currency") {
+			return format_currency(value, row.currency);
+		}
+		if (column.fieldtype === "Int") {
+			return format_number(value, null, 0);
+		}
+		return `<span class="vt-toggle btn btn-default btn-xs mr-2">${frappe.utils.icon("down", "xs")}</span>${frappe.utils.escape_html(
+			value
+		)}`;
+	}
+
+	get_expanded_html(row) {
+		// The Card View Summaries Of One Party, Side By Side
+		return `<div class="d-flex py-2">${this.opts.sections
+			.map(
+				(section) => `<div class="pr-4" style="min-width: 200px;">
+					<b>${section.doctype}</b><br>${this.get_section_html(row, section) || __("No records")}
+				</div>`
+			)
+			.join("")}</div>`;
+	}
+
+	load_more_grid() {
+		// Next Page Of The Compact Grid, One Request At A Time
+		if (this.current_request || this.job_key || this.rows.length >= this.paging.total) {
+			return;
+		}
+		this.fetch_insights(this.paging.page + 1);
+	}
+
+	fetch_ageing(page_no = 1) {
+		// Ageing View: Outstanding Invoices Per Party By Days Past Due, Pages Appended On Scroll
+		let request_seq = ++this.request_seq;
+		// Ageing rows are not delta refreshed or patched live
+		this.reset_details();
+		this.watermark = null;
+		this.rows = [];
+
+		if (this.current_request && this.current_request.abort) {
+			this.current_request.abort();
+		}
+		this.page.set_indicator(__("Loading..."), "orange");
+
+		this.current_request = frappe.call({
+			method: this.opts.ageing_method,
+			args: {
+				filters: this.filters,
+				page: page_no,
+				page_length: this.grid_page_length,
+			},
+			callback: (r) => {
+				if (request_seq === this.request_seq && r.message) {
+					this.render_ageing(r.message);
+				}
+			},
+			always: () => {
+				if (request_seq === this.request_seq) {
+					this.current_request = null;
+					this.page.clear_indicator();
+				}
+			},
+		});
+	}
+
+	render_ageing(message) {
+		this.ageing = { page: message.page, total: message.total };
+		this.page.set_title_sub(__("Ageing as of {0}", [frappe.datetime.str_to_user(message.as_of)]));
+
+		let rows = message.rows.map((values) => {
+			let row = {};
+			message.columns.forEach((column, idx) => (row[column] = values[idx]));
+			return row;
+		});
+
+		if (!this.ageing_table) {
+			this.make_ageing_table(message.buckets);
+		}
+
+		let values = rows.map((row) =>
+			this.ageing_table.columns.map((column) =>
+				column.fieldname === "party_name" ? row.party_name || row.party : row[column.fieldname]
+			)
+		);
+		if (message.page > 1) {
+			this.ageing_rows = this.ageing_rows.concat(rows);
+			this.ageing_table.append_rows(values);
+		} else {
+			this.ageing_rows = rows;
+			this.ageing_table.viewport.scrollTop(0);
+			this.ageing_table.set_rows(values, message.totals);
+		}
+	}
+
+	make_ageing_table(buckets) {
+		// Invoice Count, Outstanding Amount And One Column Per Age Bucket, Totalled Over Every Party
+		this.ageing_table = new insightly.VirtualTable(this.ageing_container, {
+			columns: [
+				{ fieldname: "party_name", label: this.opts.party_type, width: "2fr" },
+				{ fieldname: "invoice_count", label: __("Invoices"), fieldtype: "Int", total: 1 },
+				{ fieldname: "total_outstanding", label: __("Outstanding"), fieldtype: "Currency", total: 1 },
+				...buckets.map(([fieldname, label]) => ({
+					fieldname: fieldname,
+					label: __("{0} Days", [label]),
+					fieldtype: "Currency",
+					total: 1,
+				})),
+			],
+			height: 600,
+			row_height: 36,
+			formatter: (value, column, idx) => {
+				if (column.fieldtype === "Currency") {
+					return format_currency(value, this.ageing_rows[idx].currency);
+				}
+				return column.fieldtype ? format_number(value, null, 0) : frappe.utils.escape_html(value ?? "");
+			},
+			on_scroll_end: () => {
+				if (!this.current_request && this.ageing_rows.length < this.ageing.total) {
+					this.fetch_ageing(this.ageing.page + 1);
+				}
+			},
+		});
+	}
+
+	start_auto_refresh() {
+		// Delta Refresh Every Minute While The Page Is Visible And No Job Is Running
+		this.auto_refresh = setInterval(() => {
+			if (!document.hidden && $(this.wrapper).is(":visible") && this.watermark && !this.job_key) {
+				this.refresh_changed();
+				this.subscribe_live();
+			}
+		}, this.refresh_interval);
+	}
+
+	refresh_changed() {
+		// Ask Only For Parties Changed Since The Watermark Of The Rows On Screen
+		// reset_details() runs on every full fetch, so a changed generation means the rows were replaced meanwhile
+		let generation = this.details_generation;
+		frappe
+			.xcall(this.opts.insights_method, {
+				filters: this.filters,
+				page: this.paging.page,
+				page_length: this.paging.page_length,
+				order_by: this.paging.order_by,
+				top_n: this.paging.top_n || 0,
+				since: this.watermark,
+			})
+			.then((r) => {
+				if (generation !== this.details_generation) {
+					return;
+				}
+				if (r.full_refresh) {
+					this.fetch_insights(this.view === "Compact" ? 1 : this.paging.page);
+					return;
+				}
+
+				this.watermark = r.watermark;
+				this.patch_rows(this.decode_rows(r.columns, r.rows));
+			});
+	}
+
+	toggle_live(enabled) {
+		// Listen For Pushed Party Rows While Live Mode Is On
+		this.live = !!enabled;
+		if (!this.live) {
+			this.live_subscription = null;
+			frappe.realtime.off("insightly_party_update", this.live_handler);
+			return;
+		}
+
+		if (!this.live_handler) {
+			this.live_handler = (data) => this.on_party_update(data);
+		}
+		frappe.realtime.on("insightly_party_update", this.live_handler);
+		this.subscribe_live();
+	}
+
+	subscribe_live() {
+		// (Re)Register The Current Date Range, Subscriptions Expire Unless Renewed
+		if (!this.live) {
+			return;
+		}
+
+		frappe
+			.xcall("insightly.insights.live.subscribe_live_insights", {
+				party_type: this.opts.party_type,
+				filters: this.filters,
+			})
+			.then((r) => {
+				if (this.live) {
+					this.live_subscription = r.subscription;
+				}
+			});
+	}
+
+	on_party_update(data) {
+		// Pushed Rows Of Other Date Ranges Or Parties Not On This Page Are Ignored
+		if (!this.live || data.subscription !== this.live_subscription) {
+			return;
+		}
+		this.patch_rows(this.decode_rows(data.columns, [data.row]));
+	}
+
+	patch_rows(rows) {
+		// Replace Changed Parties In Place; Parties Not On This Page Show Up On The Next Full Fetch
+		let patched = [];
+		rows.forEach((row) => {
+			let idx = this.rows.findIndex((current) => current.party === row.party);
+			if (idx === -1) {
+				return;
+			}
+			patched.push(row);
+
+			this.rows[idx] = row;
+			if (this.view === "Compact") {
+				this.grid.update_row(idx, this.get_grid_row(row));
+			} else {
+				this.data_table.refreshRow(this.get_table_row(row), idx);
+			}
+			delete this.prefetched_details[row.party];
+		});
+		this.fetch_trends(patched);
+	}
+
+	update_pager() {
+		// Update Pager Info And Button States
+		let start = (this.paging.page - 1) * this.paging.page_length;
+		let end = Math.min(start + this.paging.page_length, this.paging.total);
+		this.pager
+			.find(".pager-info")
+			.text(this.paging.total ? __("Showing {0} - {1} of {2}", [start + 1, end, this.paging.total]) : "");
+		this.pager.find(".pager-prev").prop("disabled", this.paging.page <= 1);
+		this.pager.find(".pager-next").prop("disabled", end >= this.paging.total);
+	}
+
+	decode_columnar(message) {
+		// Decode One Array Per Column (dictionary-encoded where listed) Into Party Objects
+		let names = Object.keys(message.columns);
+		let columns = names.map((name) => {
+			let values = message.columns[name];
+			let dictionary = message.dictionaries[name];
+			return dictionary ? values.map((code) => (code < 0 ? null : dictionary[code])) : values;
+		});
+
+		let rows = [];
+		for (let idx = 0; idx < message.length; idx++) {
+			rows.push(columns.map((values) => values[idx]));
+		}
+		return this.decode_rows(names, rows);
+	}
+
+	decode_rows(columns, rows) {
+		// Turn Schema + Row Tuples Into Party Objects With One Entry Per Doctype Section
+		return rows.map((values) => {
+			let row = {};
+			columns.forEach((column, idx) => {
+				let [section, field] = column.split(".");
+				if (field) {
+					row[section] = row[section] || {};
+					row[section][field] = values[idx];
+				} else {
+					row[column] = values[idx];
+				}
+			});
+
+			// Sections without records (in either period when comparing) are left empty
+			this.opts.sections.forEach((section) => {
+				let data = row[section.key];
+				if (!data || !(data.total_records || data.previous_total_records)) {
+					row[section.key] = null;
+				}
+			});
+			return row;
+		});
+	}
+
+	update_table(data) {
+		// Update Fetched Data To DataTable
+		this.data_table.refresh(data.map((row) => this.get_table_row(row)));
+	}
+
+	get_table_row(row) {
+		return [
+			`Name: ${row.party_name || ""}<br>Phone: ${row.mobile_no || ""}<br>Email ID: ${row.email_id || ""}<br>${this.get_sparkline_html(
+				row.party
+			)}`,
+			...this.opts.sections.map((section) => this.get_section_html(row, section)),
+		];
+	}
+
+	get_section_html(row, section) {
+		// Doctype Summary With A Details Button, Empty When The Party Has No Records
+		// Amounts arrive as numbers and are formatted here in the party's currency
+		let data = row[section.key];
+		if (!data) {
+			return ``;
+		}
+
+		let amount = (value) => format_currency(value || 0, row.currency);
+		// With a comparison period every line also shows the change against it
+		let change = (field) =>
+			`${field}_delta` in data ? ` ${this.get_change_html(data[`${field}_delta`], this.get_percent_change(data, field))}` : "";
+
+		let lines = [`Total Records: ${data.total_records || 0}${change("total_records")}`];
+		if ("total_qty" in data) {
+			lines.push(`${section.qty_label || "Total Qty"}: ${format_number(data.total_qty || 0, null, 0)} Qty${change("total_qty")}`);
+		}
+		if ("total_taxable_amount" in data) {
+			lines.push(`Total Taxable Amount: ${amount(data.total_taxable_amount)}${change("total_taxable_amount")}`);
+		}
+		lines.push(`Total Amount: ${amount(data.total_amount)}${change("total_amount")}`);
+		if ("paid_amount" in data) {
+			lines.push(`Total Paid Amount: ${amount(data.paid_amount)}${change("paid_amount")}`);
+		}
+		if ("pending_amount" in data) {
+			lines.push(`Total Pending Amount: ${amount(data.pending_amount)}${change("pending_amount")}`);
+		}
+
+		let details = JSON.stringify({ total_records: data.total_records, total_qty: data.total_qty });
+		return `${lines.join("<br>")}<br><br>
+			<button class="btn btn-secondary details-btn"
+				data-party="${row.party}"
+				data-doctype="${section.doctype}"
+				data-details='${details}'>
+				Details
+			</button>`;
+	}
+
+	get_percent_change(data, field) {
+		// Change Against The Previous Period In Percent, "New" When There Was Nothing Before
+		let previous = data[`previous_${field}`] || 0;
+		let delta = data[`${field}_delta`] || 0;
+		if (!previous) {
+			return data[field] ? __("New") : "0%";
+		}
+		return `${this.get_sign(delta)}${format_number(Math.abs((delta / previous) * 100), null, 1)}%`;
+	}
+
+	get_sign(delta) {
+		return delta > 0 ? "+" : delta < 0 ? "-" : "";
+	}
+
+	get_change_html(delta, label) {
+		let indicator = delta > 0 ? "text-success" : delta < 0 ? "text-danger" : "text-muted";
+		return `<span class="${indicator}">${label}</span>`;
+	}
+
+	export_insights(file_format) {
+		// Streamed Download Of Every Party Matching The Current Filters
+		let args = $.param({ filters: JSON.stringify(this.filters), file_format: file_format });
+		window.open(`/api/method/${this.opts.export_method}?${args}`);
+	}
+
+	prefetch_details(rows) {
+		// Warm The Drill-Downs Of The Visible Parties With One Batched Call In The Background
+		if (!this.opts.details_batch_method || !rows.length) {
+			return;
+		}
+
+		let generation = this.details_generation;
+		frappe
+			.xcall(this.opts.details_batch_method, {
+				parties: rows.map((row) => row.party),
+				filters: this.filters,
+			})
+			.then((r) => {
+				// Drop results that belong to an earlier page or filter set
+				if (generation !== this.details_generation) {
+					return;
+				}
+				Object.assign(this.detail_columns, r.columns);
+				Object.assign(this.prefetched_details, r.data);
+			});
+	}
+
+	reset_details() {
+		this.details_generation = (this.details_generation || 0) + 1;
+		this.prefetched_details = {};
+		this.detail_columns = this.detail_columns || {};
+	}
+
+	open_details(party, doctype, details) {
+		// Use The Prefetched First Page When Available, Otherwise Ask The Server
+		let prefetched = (this.prefetched_details[party] || {})[doctype];
+		if (prefetched) {
+			this.show_details(party, doctype, details, {
+				columns: this.detail_columns[doctype],
+				...prefetched,
+			});
+			return;
+		}
+
+		frappe.call({
+			method: this.opts.details_method,
+			args: {
+				party: party,
+				doctype: doctype,
+				details: details,
+				filters: this.filters,
+				page_length: this.detail_page_length,
+			},
+			callback: (r) => {
+				if (r.message) {
+					this.show_details(party, doctype, details, r.message);
+				}
+			},
+		});
+	}
+
+	show_details(party, doctype, details, data) {
+		// Open Dialog Box With The Drill-Down In A Virtualised Table That Loads More Rows On Scroll
+		let detail = {
+			party: party,
+			doctype: doctype,
+			details: details,
+			sort_by: "",
+			search: "",
+			loaded: data.rows.length,
+			total_rows: data.total_rows,
+			request: 0,
+		};
+
+		let d = new frappe.ui.Dialog({
+			title: `${doctype} Details`,
+			size: "large",
+			fields: [
+				{
+					fieldtype: "Data",
+					label: __("Search"),
+					fieldname: "search",
+					onchange: () => {
+						detail.search = d.get_value("search") || "";
+						this.load_details(detail, true);
+					},
+				},
+				{ fieldtype: "Column Break" },
+				{
+					fieldtype: "Select",
+					label: __("Sort By"),
+					fieldname: "sort_by",
+					options: this.get_detail_sort_options(data.columns),
+					onchange: () => {
+						detail.sort_by = d.get_value("sort_by") || "";
+						this.load_details(detail, true);
+					},
+				},
+				{ fieldtype: "Section Break" },
+				{ fieldtype: "HTML", fieldname: "details_html" },
+			],
+			primary_action_label: "Close",
+			primary_action() {
+				d.hide();
+			},
+		});
+
+		let wrapper = d.fields_dict.details_html.$wrapper;
+		wrapper.html(`
+			<h5>${this.opts.party_type} Name - ${frappe.utils.escape_html(party)}</h5>
+			<h5>Total ${doctype}: ${details.total_records}</h5>
+			<br>
+			<h4>Item Details <small class="text-muted details-count"></small></h4>`);
+		detail.count = wrapper.find(".details-count");
+
+		d.show();
+		d.$wrapper.find(".modal-dialog").css("max-width", "1000px");
+
+		detail.table = new insightly.VirtualTable(wrapper, {
+			columns: data.columns,
+			rows: data.rows,
+			totals: data.totals,
+			on_scroll_end: () => this.load_details(detail),
+		});
+		this.update_details_count(detail);
+	}
+
+	load_details(detail, reset = false) {
+		// Fetch The Next Page, Or The First Page Again After The Search Or Sort Changed
+		if (!reset && (detail.loading || detail.loaded >= detail.total_rows)) {
+			return;
+		}
+
+		let request = ++detail.request;
+		detail.loading = true;
+		frappe
+			.xcall(this.opts.details_method, {
+				party: detail.party,
+				doctype: detail.doctype,
+				details: detail.details,
+				filters: this.filters,
+				start: reset ? 0 : detail.loaded,
+				page_length: this.detail_page_length,
+				sort_by: detail.sort_by,
+				search: detail.search,
+			})
+			.then((r) => {
+				// A newer search or sort has been requested meanwhile
+				if (request !== detail.request) {
+					return;
+				}
+
+				detail.loading = false;
+				detail.total_rows = r.total_rows;
+				if (reset) {
+					detail.loaded = r.rows.length;
+					detail.table.viewport.scrollTop(0);
+					detail.table.set_rows(r.rows, r.totals);
+				} else {
+					detail.loaded += r.rows.length;
+					detail.table.append_rows(r.rows);
+				}
+				this.update_details_count(detail);
+			})
+			.catch(() => {
+				detail.loading = false;
+			});
+	}
+
+	update_details_count(detail) {
+		detail.count.text(__("{0} of {1}", [detail.loaded, detail.total_rows]));
+	}
+
+	get_detail_sort_options(columns) {
+		// Default Order Plus Highest / Lowest First For Every Totalled Amount Or Qty Column
+		let options = [{ label: __("Default"), value: "" }];
+		columns
+			.filter((column) => column.total)
+			.forEach((column) => {
+				options.push({ label: __("{0} (High To Low)", [column.label]), value: `${column.fieldname} desc` });
+				options.push({ label: __("{0} (Low To High)", [column.label]), value: `${column.fieldname} asc` });
+			});
+		return options;
+	}
+};
@@ -0,0 +1,207 @@
+// Virtualised Read-Only Table
+// Renders only the rows inside the scroll viewport, so drill-downs and party lists with thousands of rows stay responsive.
+// Columns are drill-down column metadata ({fieldname, label, fieldtype, width, total}), rows are value arrays
+// in column order and totals is a {fieldname: value} map shown in a sticky footer.
+// Rows can be expanded into a fixed-height detail view (get_expanded_html), clicks are handled by one
+// delegated handler (on_click) and a formatter can override the per-column formatting.
+
+frappe.provide("insightly");
+
+insightly.VirtualTable = class VirtualTable {
+	constructor(parent, opts) {
+		this.parent = $(parent);
+		this.columns = opts.columns;
+		this.rows = opts.rows || [];
+		this.totals = opts.totals || {};
+		this.row_height = opts.row_height || 33;
+		this.height = opts.height || 400;
+		this.overscan = opts.overscan || 10;
+		this.formatter = opts.formatter;
+		// Called when the last rows are scrolled into view, to load the next page
+		this.on_scroll_end = opts.on_scroll_end;
+		// Called as on_click(row_idx, event) for clicks inside a row or its expanded view
+		this.on_click = opts.on_click;
+
+		// Expandable Rows, Kept As A Sorted List Of Row Indexes
+		this.get_expanded_html = opts.get_expanded_html;
+		this.expanded_height = opts.expanded_height || 0;
+		this.expanded = [];
+
+		this.make();
+		this.render();
+	}
+
+	make() {
+		this.template = this.columns.map((column) => column.width || "1fr").join(" ");
+
+		this.wrapper = $(`<div class="insightly-virtual-table border rounded">
+			<div class="vt-header font-weight-bold border-bottom"></div>
+			<div class="vt-viewport" style="height: ${this.height}px; overflow-y: auto; position: relative;">
+				<div class="vt-spacer" style="position: relative;">
+					<div class="vt-window" style="position: absolute; left: 0; right: 0;"></div>
+				</div>
+			</div>
+			<div class="vt-footer font-weight-bold border-top"></div>
+		</div>`).appendTo(this.parent);
+
+		this.viewport = this.wrapper.find(".vt-viewport");
+		this.spacer = this.wrapper.find(".vt-spacer");
+		this.window = this.wrapper.find(".vt-window");
+
+		this.wrapper
+			.find(".vt-header")
+			.html(this.get_row_html(this.columns.map((column) => frappe.utils.escape_html(column.label))));
+		this.render_footer();
+
+		// Re-render on the next frame only, however many scroll events arrive
+		this.viewport.on("scroll", () => {
+			if (!this.frame) {
+				this.frame = requestAnimationFrame(() => {
+					this.frame = null;
+					this.render();
+				});
+			}
+		});
+
+		// One Delegated Handler For Every Row, Rendered Or Not
+		this.viewport.on("click", "[data-idx]", (e) => {
+			let idx = cint($(e.currentTarget).attr("data-idx"));
+			if ($(e.target).closest(".vt-toggle").length) {
+				this.toggle(idx);
+			} else if (this.on_click) {
+				this.on_click(idx, e);
+			}
+		});
+	}
+
+	set_rows(rows, totals) {
+		this.rows = rows;
+		this.expanded = [];
+		if (totals) {
+			this.totals = totals;
+			this.render_footer();
+		}
+		this.invalidate();
+	}
+
+	append_rows(rows) {
+		this.rows = this.rows.concat(rows);
+		this.invalidate();
+	}
+
+	update_row(idx, values) {
+		this.rows[idx] = values;
+		this.invalidate();
+	}
+
+	toggle(idx) {
+		// Expand Or Collapse The Detail View Below A Row
+		let pos = this.expanded.indexOf(idx);
+		if (pos === -1) {
+			this.expanded.push(idx);
+			this.expanded.sort((a, b) => a - b);
+		} else {
+			this.expanded.splice(pos, 1);
+		}
+		this.invalidate();
+	}
+
+	render() {
+		// Only The Rows In (And Just Around) The Viewport Are Put In The DOM
+		this.spacer.css(
+			"height",
+			`${this.rows.length * this.row_height + this.expanded.length * this.expanded_height}px`
+		);
+
+		let scroll_top = this.viewport.scrollTop();
+		let first = Math.max(0, this.get_index_at(scroll_top) - this.overscan);
+		let last = Math.min(this.rows.length, this.get_index_at(scroll_top + this.height) + 1 + this.overscan);
+		if (first === this.first && last === this.last) {
+			return;
+		}
+		this.first = first;
+		this.last = last;
+
+		let html = [];
+		for (let idx = first; idx < last; idx++) {
+			html.push(
+				this.get_row_html(
+					this.rows[idx].map((value, col) => this.format(value, this.columns[col], idx)),
+					idx
+				)
+			);
+			if (this.get_expanded_html && this.expanded.includes(idx)) {
+				html.push(`<div class="vt-expanded border-bottom px-2" data-idx="${idx}"
+					style="height: ${this.expanded_height}px; overflow: auto;">${this.get_expanded_html(idx)}</div>`);
+			}
+		}
+		this.window.css("top", `${this.get_offset(first)}px`).html(html.join(""));
+
+		if (this.on_scroll_end && this.rows.length && last >= this.rows.length) {
+			this.on_scroll_end();
+		}
+	}
+
+	get_index_at(y) {
+		// Row Under A Vertical Position, Skipping The Expanded Views Above It
+		let extra = 0;
+		for (let idx of this.expanded) {
+			let row_end = (idx + 1) * this.row_height + extra;
+			if (y < row_end) {
+				break;
+			}
+			if (y < row_end + this.expanded_height) {
+				return idx;
+			}
+			extra += this.expanded_height;
+		}
+		return Math.floor((y - extra) / this.row_height);
+	}
+
+	get_offset(idx) {
+		return idx * this.row_height + this.expanded.filter((expanded) => expanded < idx).length * this.expanded_height;
+	}
+
+	render_footer() {
+		let footer = this.wrapper.find(".vt-footer");
+		if (!this.columns.some((column) => column.total)) {
+			footer.addClass("hide");
+			return;
+		}
+
+		footer.html(
+			this.get_row_html(
+				this.columns.map((column, idx) => {
+					if (column.total) {
+						return this.format(this.totals[column.fieldname] || 0, column);
+					}
+					return idx === 0 ? __("Total") : "";
+				})
+			)
+		);
+	}
+
+	get_row_html(cells, idx) {
+		return `<div class="vt-row" ${idx === undefined ? "" : `data-idx="${idx}"`}
+			style="display: grid; grid-template-columns: ${this.template}; height: ${
+			this.row_height
+		}px; align-items: center;">${cells
+			.map((cell) => `<div class="px-2 text-truncate">${cell}</div>`)
+			.join("")}</div>`;
+	}
+
+	format(value, column, idx) {
+		if (this.formatter && idx !== undefined) {
+			return this.formatter(value, column, idx);
+		}
+		return column.fieldtype
+			? frappe.format(value, { fieldtype: column.fieldtype })
+			: frappe.utils.escape_html(value ?? "");
+	}
+
+	invalidate() {
+		// Force The Next render() To Redraw The Visible Rows
+		this.first = this.last = null;
+		this.render();
+	}
+};